@@ -0,0 +1,361 @@
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field, FiniteFloat
+from typing import Dict, List, Any, Optional
+import hmac
+import math
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+from Backend.cliente_llm import ClienteLLM
+from Backend.geometrias import respuesta_geometrias
+from Backend.metricas import Metricas, MiddlewareTiempos, medir
+from Backend.motor_scores import top_k_indices, top_k_indices_lote
+from Backend.palabras_clave import MotorPalabrasClave
+from Backend.pesos import DEFAULT_WEIGHTS
+from Backend.snapshot import Dataset, GestorDataset
+
+load_dotenv()
+
+# Variables del sistema
+VARIABLES = ["salut", "transporte", "precio", "ocio", "seguridad", "densidad_poblacion"]
+
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME = "joc_de_barris"
+COL_BARRIOS = "barrios"
+
+LLM_API_KEY = os.getenv("LLM_API_KEY")
+LLM_ENDPOINT = os.getenv("LLM_ENDPOINT", "https://routellm.abacus.ai/v1/chat/completions")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "5"))
+LLM_MAX_CONCURRENCIA = int(os.getenv("LLM_MAX_CONCURRENCIA", "8"))  # más allá -> palabras clave
+LLM_CACHE_MAX = int(os.getenv("LLM_CACHE_MAX", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))  # segundos
+# Tope de prefs por petición de /api/recomendar_batch: cada una reserva una fila de scores por barrio
+MAX_PREFS_LOTE = int(os.getenv("MAX_PREFS_LOTE", "256"))
+# Tope de caracteres del texto libre: va al LLM y, si no responde, al análisis por palabras clave
+MAX_TEXTO = int(os.getenv("MAX_TEXTO", "2000"))
+# Token de los endpoints /api/admin/* (cabecera X-Admin-Token); sin él, esos endpoints no existen (404)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+# === MODELOS ===
+class Location(BaseModel):
+    lat: float
+    lon: float
+
+
+class BarrioOut(BaseModel):
+    barrio_id: str
+    nombre: str
+    score: float
+    coords: Dict[str, float]
+    location: Location
+    geometry: Optional[Dict[str, Any]] = None
+
+
+class FiltroZona(BaseModel):
+    # Un barrio entra si su centroide cae dentro; si se combinan varios filtros, se exigen todos
+    bbox: Optional[List[float]] = None  # [min_lon, min_lat, max_lon, max_lat], p. ej. el viewport del mapa
+    centro: Optional[Location] = None  # junto con radio_km: "a menos de X km del trabajo"
+    radio_km: Optional[float] = None
+    poligono: Optional[List[List[float]]] = None  # [[lon, lat], ...] como en GeoJSON
+
+
+class PreferenciasRequest(BaseModel):
+    texto: str = Field(..., max_length=MAX_TEXTO)  # más -> 422
+    top_k: int = 3
+    # Overrides opcionales {categoria: {sub_variable: peso}} sobre DEFAULT_WEIGHTS
+    sub_pesos: Optional[Dict[str, Dict[str, FiniteFloat]]] = None
+    # False -> respuesta ligera (sin geometry); las formas se piden a /api/geometrias
+    incluir_geometria: bool = True
+    # Limita la recomendación a una zona del mapa (None = toda la ciudad)
+    zona: Optional[FiltroZona] = None
+
+
+class PreferenciasDirectasRequest(BaseModel):
+    prefs: Dict[str, FiniteFloat]  # 1e309 o NaN -> 422 (no son puntuables)
+    top_k: int = 3
+    # Overrides opcionales {categoria: {sub_variable: peso}} sobre DEFAULT_WEIGHTS
+    sub_pesos: Optional[Dict[str, Dict[str, FiniteFloat]]] = None
+    # False -> respuesta ligera (sin geometry); las formas se piden a /api/geometrias
+    incluir_geometria: bool = True
+    # Limita la recomendación a una zona del mapa (None = toda la ciudad)
+    zona: Optional[FiltroZona] = None
+
+
+class PreferenciasLoteRequest(BaseModel):
+    prefs: List[Dict[str, FiniteFloat]] = Field(..., max_length=MAX_PREFS_LOTE)  # más, o no finitos -> 422
+    top_k: int = 3
+    # Overrides opcionales {categoria: {sub_variable: peso}} sobre DEFAULT_WEIGHTS
+    sub_pesos: Optional[Dict[str, Dict[str, FiniteFloat]]] = None
+    # False -> respuesta ligera (sin geometry); las formas se piden a /api/geometrias
+    incluir_geometria: bool = True
+
+
+class RecomendacionResponse(BaseModel):
+    prefs: Dict[str, float]
+    barrios: List[BarrioOut]
+
+
+class RecomendacionLoteResponse(BaseModel):
+    resultados: List[RecomendacionResponse]
+
+
+class BarrioEnPuntoResponse(BaseModel):
+    barrio_id: str
+    nombre: str
+    location: Location
+
+
+# === DATOS (SNAPSHOT MAPEADO + RECARGA EN CALIENTE) ===
+# Al arrancar se mapea el snapshot publicado (matrices de scores, ids, geometrías pre-serializadas)
+# sin tocar Mongo; si no hay ninguno, se lee Mongo una vez y se compila. Cada petición coge
+# `datos.actual` una sola vez, así que una recarga nunca la deja a medias.
+datos = GestorDataset(VARIABLES, DEFAULT_WEIGHTS, MONGO_URI, DB_NAME, COL_BARRIOS)
+
+
+# === FILTRO ESPACIAL ===
+def candidatos_en_zona(ds: Dataset, zona: Optional[FiltroZona]) -> Optional[np.ndarray]:
+    if zona is None:
+        return None
+    centro = {"lat": zona.centro.lat, "lon": zona.centro.lon} if zona.centro else None
+    try:
+        return ds.espacial.filtrar(zona.bbox, centro, zona.radio_km, zona.poligono)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# === FUNCIÓN AUXILIAR DE NORMALIZACIÓN ===
+def normalizar_prefs(prefs: Dict[str, float]) -> Dict[str, float]:
+    """
+    Toma un diccionario de pesos y asegura que la suma sea 1.0 (100%).
+    Si la suma es 0, devuelve todo a 0.
+    """
+    total = sum(prefs.values())
+    if total > 0:
+        return {k: v / total for k, v in prefs.items()}
+    return prefs  # Todo ceros
+
+
+# === ALGORITMO DE RECOMENDACIÓN ===
+# Producto punto simple: CoordsBarrio * PesoUsuario
+# Como prefs suman 1.0 (si pasó por normalizar_prefs), el score máximo teórico será 1.0
+def recomendar_desde_prefs(prefs: Dict[str, float], top_k: int = 3,
+                           sub_pesos: Optional[Dict[str, Dict[str, float]]] = None,
+                           incluir_geometria: bool = True, zona: Optional[FiltroZona] = None):
+    ds = datos.actual
+    vista = ds.motor.con_sub_pesos(sub_pesos)
+    # Solo se puntúan los barrios de la zona pedida (índices ordenados: mismo desempate que sin filtro)
+    candidatos = candidatos_en_zona(ds, zona)
+    with medir("puntuacion"):
+        scores = vista.puntuar_pesos(prefs, candidatos)
+        ganadores = top_k_indices(scores, top_k)
+        indices = ganadores if candidatos is None else candidatos[ganadores]
+    return vista.resultados(indices, scores[ganadores], incluir_geometria)
+
+
+def recomendar_lote(lista_prefs: List[Dict[str, float]], top_k: int = 3,
+                    sub_pesos: Optional[Dict[str, Dict[str, float]]] = None,
+                    incluir_geometria: bool = True) -> List[List[Dict[str, Any]]]:
+    if not lista_prefs:
+        return []
+    vista = datos.actual.motor.con_sub_pesos(sub_pesos)
+
+    # Todos los vectores de pesos en una sola multiplicación de matrices
+    with medir("puntuacion"):
+        scores = vista.puntuar_pesos_lote(lista_prefs)
+        ganadores = top_k_indices_lote(scores, top_k)
+    return [vista.resultados(idx, fila[idx], incluir_geometria) for idx, fila in zip(ganadores, scores)]
+
+
+# === HEURÍSTICA (PALABRAS CLAVE) ===
+# Reglas en reglas_palabras_clave.json (sección "pesos"), compiladas en un único matcher.
+# INICIO EN 0.0: Si no se menciona, no cuenta.
+palabras_clave = MotorPalabrasClave("pesos")
+
+
+def analisis_por_palabras_clave(texto: str) -> Dict[str, float]:
+    # NORMALIZAR PARA QUE SUMEN 100%
+    with medir("palabras_clave"):
+        return normalizar_prefs(palabras_clave.analizar(texto, VARIABLES))
+
+
+# === LLM ===
+SYSTEM_PROMPT = f"""
+    Analiza el texto del usuario para encontrar qué busca en un barrio.
+    Variables disponibles: {', '.join(VARIABLES)}.
+
+    Instrucciones:
+    1. Asigna una importancia de 0 a 10 a cada variable MENCIONADA.
+    2. Si una variable NO se menciona o no es relevante, su valor debe ser 0.
+    3. Devuelve SOLO un JSON con las claves y valores numéricos.
+    """
+
+
+def limpiar_respuesta_llm(raw_prefs: Dict[str, Any]) -> Dict[str, float]:
+    # Limpiar y asegurar estructura (default 0.0 si no existe)
+    clean_prefs = {v: float(raw_prefs.get(v, 0.0)) for v in VARIABLES}
+    clean_prefs = {v: x if math.isfinite(x) else 0.0 for v, x in clean_prefs.items()}  # NaN/Infinity del JSON
+
+    # NORMALIZAR EL RESULTADO DEL LLM AL 100%
+    return normalizar_prefs(clean_prefs)
+
+
+cliente_llm = ClienteLLM(
+    LLM_ENDPOINT, LLM_API_KEY, LLM_MODEL, SYSTEM_PROMPT,
+    limpiar=limpiar_respuesta_llm,
+    fallback=analisis_por_palabras_clave,
+    timeout=LLM_TIMEOUT,
+    max_concurrencia=LLM_MAX_CONCURRENCIA,
+    cache_max=LLM_CACHE_MAX,
+    cache_ttl=LLM_CACHE_TTL,
+)
+
+
+async def llamar_llm_y_mapear(texto_usuario: str) -> Dict[str, float]:
+    return await cliente_llm.traducir(texto_usuario)
+
+
+# === MÉTRICAS ===
+# Latencia por ruta y por etapa (también en la cabecera Server-Timing de cada respuesta) y contadores
+# del LLM y de las cachés, en formato Prometheus en /metrics.
+metricas = Metricas()
+
+
+def metricas_de_caches():
+    cache = cliente_llm.cache
+    yield "llm_cache_aciertos_total", "counter", "Traducciones servidas desde la caché del LLM", {}, cache.aciertos
+    yield "llm_cache_fallos_total", "counter", "Traducciones que no estaban en la caché del LLM", {}, cache.fallos
+    for motivo in ("sin_api_key", "saturado", "error"):
+        yield ("llm_fallback_total", "counter", "Traducciones resueltas por palabras clave, por motivo",
+               {"motivo": motivo}, cliente_llm.fallbacks[motivo])
+
+    # Se reinician al recargar el dataset (cada motor tiene su caché)
+    ds = datos.actual
+    vistas = ds.motor.info_cache_vistas()
+    yield "vistas_sub_pesos_aciertos_total", "counter", "Vistas por sub-pesos servidas desde caché", {}, vistas.hits
+    yield "vistas_sub_pesos_fallos_total", "counter", "Vistas por sub-pesos calculadas", {}, vistas.misses
+    yield "vistas_sub_pesos_en_cache", "gauge", "Vistas por sub-pesos guardadas", {}, vistas.currsize
+    yield "dataset_barrios", "gauge", "Barrios del dataset activo", {"version": ds.version}, len(ds.motor)
+
+
+metricas.recolector(metricas_de_caches)
+
+
+# === ENDPOINTS API ===
+app = FastAPI()
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"],
+                   allow_headers=["*"])
+app.add_middleware(MiddlewareTiempos, metricas=metricas, rutas=lambda: [r.path for r in app.routes])
+
+
+def respuesta_json(modelo: BaseModel) -> Response:
+    # La respuesta sale ya en JSON: FastAPI no la vuelve a validar ni a serializar, y construirla y
+    # serializarla queda dentro de la etapa "serializacion" del endpoint (Server-Timing y /metrics)
+    return Response(modelo.model_dump_json(exclude_none=True), media_type="application/json")
+
+
+@app.exception_handler(RequestValidationError)
+async def error_de_validacion(request, exc: RequestValidationError):
+    # Como el 422 de FastAPI pero sin repetir "input": un 1e309 (inf) o un NaN no se pueden pasar a JSON
+    errores = [{k: v for k, v in error.items() if k != "input"} for error in exc.errors()]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errores)})
+
+
+@app.on_event("startup")
+def iniciar_recarga_datos():
+    datos.iniciar_vigilancia()
+
+
+@app.on_event("shutdown")
+async def cerrar_cliente_llm():
+    await cliente_llm.cerrar()
+
+
+@app.post("/api/recomendar_desde_texto", response_model=RecomendacionResponse)
+async def api_recomendar_desde_texto(req: PreferenciasRequest):
+    # 1. Obtenemos preferencias normalizadas (Suma = 1.0)
+    prefs = await llamar_llm_y_mapear(req.texto)
+
+    # 2. Buscamos barrios
+    # Puntuar (y leer geometrías) es CPU: fuera del event loop, para no frenar las llamadas al LLM en vuelo
+    barrios = await run_in_threadpool(recomendar_desde_prefs, prefs, top_k=req.top_k, sub_pesos=req.sub_pesos,
+                                      incluir_geometria=req.incluir_geometria, zona=req.zona)
+
+    with medir("serializacion"):
+        return respuesta_json(RecomendacionResponse(prefs=prefs, barrios=[BarrioOut(**b) for b in barrios]))
+
+
+@app.post("/api/recomendar_desde_prefs", response_model=RecomendacionResponse)
+def api_recomendar_desde_prefs(req: PreferenciasDirectasRequest):
+    # En modo manual, también normalizamos lo que viene del front
+    # para que el gráfico de "Tu Juramento" muestre % reales.
+    prefs_norm = normalizar_prefs(req.prefs)
+
+    barrios = recomendar_desde_prefs(prefs_norm, top_k=req.top_k, sub_pesos=req.sub_pesos,
+                                     incluir_geometria=req.incluir_geometria, zona=req.zona)
+    with medir("serializacion"):
+        return respuesta_json(RecomendacionResponse(prefs=prefs_norm, barrios=[BarrioOut(**b) for b in barrios]))
+
+
+@app.post("/api/recomendar_batch", response_model=RecomendacionLoteResponse)
+def api_recomendar_batch(req: PreferenciasLoteRequest):
+    lista_prefs = [normalizar_prefs(p) for p in req.prefs]
+
+    lote = recomendar_lote(lista_prefs, top_k=req.top_k, sub_pesos=req.sub_pesos,
+                           incluir_geometria=req.incluir_geometria)
+    with medir("serializacion"):
+        return respuesta_json(RecomendacionLoteResponse(resultados=[
+            RecomendacionResponse(prefs=prefs, barrios=[BarrioOut(**b) for b in barrios])
+            for prefs, barrios in zip(lista_prefs, lote)
+        ]))
+
+
+@app.get("/api/geometrias")
+def api_geometrias(nivel: int = 0, if_none_match: Optional[str] = Header(None),
+                   accept_encoding: Optional[str] = Header(None)):
+    # Bytes pre-serializados: sin Pydantic, cacheables por ETag y servidos en gzip si se acepta
+    return respuesta_geometrias(datos.actual.geometrias, nivel, if_none_match, accept_encoding)
+
+
+@app.get("/api/barrio_en_punto", response_model=BarrioEnPuntoResponse)
+def api_barrio_en_punto(lat: float, lon: float):
+    # Rejilla de cajas para los candidatos y point-in-polygon exacto solo con esos
+    ds = datos.actual
+    i = ds.espacial.barrio_en_punto(lat, lon, ds.motor.geometrias)
+    if i is None:
+        raise HTTPException(status_code=404, detail="Ningún barrio contiene ese punto")
+    motor = ds.motor
+    return BarrioEnPuntoResponse(barrio_id=motor.ids[i], nombre=motor.nombres[i], location=motor.locations[i])
+
+
+@app.get("/metrics")
+def api_metricas():
+    return Response(metricas.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def comprobar_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Token de administración no válido")
+
+
+@app.post("/api/admin/recargar_reglas", dependencies=[Depends(comprobar_admin)])
+def api_recargar_reglas():
+    # Relee reglas_palabras_clave.json al momento en este worker. Los demás lo recogen solos al ver
+    # que ha cambiado la fecha de modificación del fichero (cada RECARGA_REGLAS_INTERVALO segundos)
+    return {"palabras": palabras_clave.recargar()}
+
+
+@app.post("/api/admin/recargar_datos", dependencies=[Depends(comprobar_admin)])
+def api_recargar_datos():
+    # Relee Mongo, compila y publica un snapshot nuevo; los demás workers lo recogen al sondear ACTUAL
+    ds = datos.recargar_desde_mongo()
+    return {"version": ds.version, "barrios": len(ds.motor)}
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Any, Optional
+
+import httpx
+
+from Backend.metricas import medir
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_texto(texto: str) -> str:
+    """Clave de caché: minúsculas y espacios colapsados ("Barato  y Seguro" == "barato y seguro")."""
+    return " ".join(texto.lower().split())
+
+
+# === CACHÉ LRU CON TTL ===
+class CacheTTL:
+    def __init__(self, max_entradas: int, ttl: float):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos: "OrderedDict[str, tuple]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, clave: str) -> Optional[Dict[str, float]]:
+        item = self._datos.get(clave)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._datos[clave]
+            self.fallos += 1
+            return None
+
+        self._datos.move_to_end(clave)
+        self.aciertos += 1
+        return item[1]
+
+    def put(self, clave: str, valor: Dict[str, float]):
+        self._datos[clave] = (time.monotonic() + self.ttl, valor)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+
+
+# === CLIENTE ASÍNCRONO ===
+class ClienteLLM:
+    """
+    Traduce texto libre a preferencias con el LLM:
+    - Pool de conexiones persistente (httpx.AsyncClient), sin bloquear workers del threadpool.
+    - Caché LRU/TTL por texto normalizado de los vectores ya parseados.
+    - Peticiones idénticas en vuelo se agrupan en una sola llamada.
+    - Si se alcanza el límite de concurrencia, se responde al momento con el fallback (palabras clave).
+    """
+
+    def __init__(self, endpoint: str, api_key: Optional[str], modelo: str, system_prompt: str,
+                 limpiar: Callable[[Dict[str, Any]], Dict[str, float]],
+                 fallback: Callable[[str], Dict[str, float]],
+                 timeout: float = 5.0, max_concurrencia: int = 8,
+                 cache_max: int = 1024, cache_ttl: float = 3600.0):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.modelo = modelo
+        self.system_prompt = system_prompt
+        self.limpiar = limpiar
+        self.fallback = fallback
+        self.timeout = timeout
+        self.max_concurrencia = max_concurrencia
+
+        self.cache = CacheTTL(cache_max, cache_ttl)
+        # Veces que se ha respondido con el fallback, por motivo (sin_api_key, saturado, error)
+        self.fallbacks: Counter = Counter()
+        self._en_vuelo: Dict[str, asyncio.Future] = {}
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def _cliente_http(self) -> httpx.AsyncClient:
+        # Se crea dentro del event loop en la primera petición y se reutiliza (keep-alive)
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrencia,
+                                    max_keepalive_connections=self.max_concurrencia),
+            )
+            self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+        return self._http
+
+    async def cerrar(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def traducir(self, texto: str) -> Dict[str, float]:
+        if not self.api_key:
+            self.fallbacks["sin_api_key"] += 1
+            return self.fallback(texto)
+
+        clave = normalizar_texto(texto)
+        cacheado = self.cache.get(clave)
+        if cacheado is not None:
+            return dict(cacheado)
+
+        # Misma pregunta ya en vuelo: esperamos su resultado en vez de repetir la llamada
+        futuro = self._en_vuelo.get(clave)
+        if futuro is not None:
+            with medir("llm"):
+                prefs = await asyncio.shield(futuro)
+            return dict(prefs) if prefs is not None else self._fallback(texto, "error")
+
+        self._cliente_http()
+        if self._semaforo.locked():
+            return self._fallback(texto, "saturado")
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = futuro
+        try:
+            with medir("llm"):
+                async with self._semaforo:
+                    prefs = await self._preguntar(texto)
+            if prefs is not None:
+                self.cache.put(clave, prefs)
+            futuro.set_result(prefs)
+        except BaseException:
+            futuro.set_result(None)
+            raise
+        finally:
+            del self._en_vuelo[clave]
+
+        return dict(prefs) if prefs is not None else self._fallback(texto, "error")
+
+    def _fallback(self, texto: str, motivo: str) -> Dict[str, float]:
+        self.fallbacks[motivo] += 1
+        return self.fallback(texto)
+
+    async def _preguntar(self, texto: str) -> Optional[Dict[str, float]]:
+        """Llamada al LLM. Devuelve None ante cualquier error (el llamador usa el fallback)."""
+        try:
+            response = await self._cliente_http().post(
+                self.endpoint,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json={
+                    "model": self.modelo,
+                    "messages": [
+                        {"role": "system", "content": self.system_prompt},
+                        {"role": "user", "content": texto}
+                    ],
+                    "temperature": 0.0
+                },
+            )
+
+            if response.status_code != 200:
+                return None
+
+            content = response.json()["choices"][0]["message"]["content"]
+            content = content.replace("```json", "").replace("```", "").strip()
+
+            return self.limpiar(json.loads(content))
+
+        except Exception as e:
+            # Se cuenta en fallbacks["error"]; el detalle va al log (sin print en el camino de cada petición)
+            logger.warning("Excepción LLM: %s", e)
+            return None
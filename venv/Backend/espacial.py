@@ -0,0 +1,271 @@
+import math
+import numpy as np
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+
+# Barrios (de media) por celda de la rejilla
+OBJETIVO_POR_CELDA = 2
+
+
+# === GEOMETRÍA ===
+def anillos_de(geo: Optional[Dict[str, Any]]) -> List[List[List[List[float]]]]:
+    """Polígonos de una geometría GeoJSON como lista de [exterior, agujeros...]."""
+    if not geo:
+        return []
+    if geo.get("type") == "Polygon":
+        return [geo["coordinates"]]
+    if geo.get("type") == "MultiPolygon":
+        return list(geo["coordinates"])
+    return []
+
+
+def bbox_geometria(geo: Optional[Dict[str, Any]]) -> Optional[List[float]]:
+    """[min_lon, min_lat, max_lon, max_lat] de los anillos exteriores (None si no hay polígono)."""
+    puntos = [p for poligono in anillos_de(geo) if poligono for p in poligono[0]]
+    if not puntos:
+        return None
+    lons = [p[0] for p in puntos]
+    lats = [p[1] for p in puntos]
+    return [min(lons), min(lats), max(lons), max(lats)]
+
+
+def centroide_geometria(geo: Optional[Dict[str, Any]]) -> Optional[Tuple[float, float]]:
+    """
+    (lat, lon) del centroide de área de los anillos exteriores (fórmula del polígono / shoelace),
+    ponderando cada polígono de un MultiPolygon por su área. Si el área es nula (anillo degenerado),
+    la media de los vértices. None si la geometría no tiene polígonos.
+    """
+    area_total, cx, cy = 0.0, 0.0, 0.0
+    vertices = []
+    for poligono in anillos_de(geo):
+        if not poligono or len(poligono[0]) < 3:
+            continue
+        anillo = np.asarray(poligono[0], dtype=np.float64)[:, :2]
+        vertices.append(anillo)
+        x, y = anillo[:, 0], anillo[:, 1]
+        x1, y1 = np.roll(x, -1), np.roll(y, -1)
+        cruz = x * y1 - x1 * y
+        area = cruz.sum() / 2
+        if area != 0:
+            cx += ((x + x1) * cruz).sum() / 6
+            cy += ((y + y1) * cruz).sum() / 6
+            area_total += area
+
+    if not vertices:
+        return None
+    if abs(area_total) < 1e-12:
+        todos = np.concatenate(vertices)
+        return float(todos[:, 1].mean()), float(todos[:, 0].mean())
+    return float(cy / area_total), float(cx / area_total)
+
+
+def puntos_en_anillo(lons: np.ndarray, lats: np.ndarray, anillo: Sequence[Sequence[float]]) -> np.ndarray:
+    """Ray casting vectorizado: qué puntos caen dentro del anillo (bucle sobre aristas, no sobre puntos)."""
+    anillo = np.asarray(anillo, dtype=np.float64)[:, :2]
+    dentro = np.zeros(lons.shape, dtype=bool)
+    if len(anillo) < 3:
+        return dentro
+
+    x1, y1 = anillo[:, 0], anillo[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    for ax, ay, bx, by in zip(x1, y1, x2, y2):
+        if ay == by:
+            continue
+        cruza = (ay > lats) != (by > lats)
+        x_corte = ax + (lats - ay) * (bx - ax) / (by - ay)
+        dentro ^= cruza & (lons < x_corte)
+    return dentro
+
+
+def punto_en_anillo(lon: float, lat: float, anillo: np.ndarray) -> bool:
+    """Ray casting de un solo punto, vectorizado sobre las aristas del anillo (array n x 2)."""
+    if len(anillo) < 3:
+        return False
+    x1, y1 = anillo[:, 0], anillo[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    cruza = (y1 > lat) != (y2 > lat)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_corte = x1 + (lat - y1) * (x2 - x1) / (y2 - y1)
+    return bool(np.count_nonzero(cruza & (lon < x_corte)) % 2)
+
+
+def poligonos_np(geo: Optional[Dict[str, Any]]) -> List[List[np.ndarray]]:
+    return [[np.asarray(anillo, dtype=np.float64)[:, :2] for anillo in poligono if anillo]
+            for poligono in anillos_de(geo) if poligono]
+
+
+def punto_en_poligonos(lon: float, lat: float, poligonos: List[List[np.ndarray]]) -> bool:
+    """Dentro de algún exterior y fuera de sus agujeros."""
+    for exterior, *agujeros in poligonos:
+        if punto_en_anillo(lon, lat, exterior) and not any(punto_en_anillo(lon, lat, a) for a in agujeros):
+            return True
+    return False
+
+
+def punto_en_geometria(lon: float, lat: float, geo: Optional[Dict[str, Any]]) -> bool:
+    return punto_en_poligonos(lon, lat, poligonos_np(geo))
+
+
+def distancia_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Haversine desde un punto a un array de puntos."""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# === REJILLA ===
+class _Rejilla:
+    """Rejilla uniforme lado x lado sobre la extensión de los datos."""
+
+    def __init__(self, extension: Sequence[float], lado: int):
+        self.min_lon, self.min_lat, max_lon, max_lat = extension
+        self.lado = lado
+        self.tam_lon = max(max_lon - self.min_lon, 1e-9) / lado
+        self.tam_lat = max(max_lat - self.min_lat, 1e-9) / lado
+
+    def celda_x(self, lon):
+        return np.clip(np.floor((np.asarray(lon) - self.min_lon) / self.tam_lon).astype(np.int64), 0, self.lado - 1)
+
+    def celda_y(self, lat):
+        return np.clip(np.floor((np.asarray(lat) - self.min_lat) / self.tam_lat).astype(np.int64), 0, self.lado - 1)
+
+
+class _Celdas:
+    """
+    Contenido de cada celda en formato CSR: los elementos de una celda quedan contiguos y, como las
+    celdas se numeran por columnas (ix * lado + iy), un rango de filas de una columna es un único slice.
+    Cada elemento entra en todas las celdas que cubre su caja.
+    """
+
+    def __init__(self, rejilla: _Rejilla, min_lon: np.ndarray, min_lat: np.ndarray,
+                 max_lon: np.ndarray, max_lat: np.ndarray):
+        self.rejilla = rejilla
+        lado = rejilla.lado
+        ix0, iy0 = rejilla.celda_x(min_lon), rejilla.celda_y(min_lat)
+        ancho, alto = rejilla.celda_x(max_lon) - ix0 + 1, rejilla.celda_y(max_lat) - iy0 + 1
+
+        total = ancho * alto
+        elem = np.repeat(np.arange(len(ix0)), total)
+        desplaz = np.arange(total.sum()) - np.repeat(np.cumsum(total) - total, total)
+        celdas = (ix0[elem] + desplaz // alto[elem]) * lado + iy0[elem] + desplaz % alto[elem]
+
+        orden = np.argsort(celdas, kind="stable")
+        self.elementos = elem[orden]
+        self.inicios = np.searchsorted(celdas[orden], np.arange(lado * lado + 1))
+
+    def en_rango(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> np.ndarray:
+        """Elementos de las celdas que toca la caja (candidatos, sin repetidos y en orden)."""
+        r = self.rejilla
+        ix0, ix1 = int(r.celda_x(min_lon)), int(r.celda_x(max_lon))
+        iy0, iy1 = int(r.celda_y(min_lat)), int(r.celda_y(max_lat))
+        trozos = [self.elementos[self.inicios[ix * r.lado + iy0]:self.inicios[ix * r.lado + iy1 + 1]]
+                  for ix in range(ix0, ix1 + 1)]
+        return np.unique(np.concatenate(trozos)) if trozos else np.empty(0, dtype=np.int64)
+
+
+# === ÍNDICE ESPACIAL ===
+class IndiceEspacial:
+    """
+    Índice en memoria sobre los centroides (location) y las cajas de los polígonos de los barrios.
+
+    - Filtros (bbox, radio, polígono): un barrio entra si su centroide cae dentro. Se devuelven
+      índices ordenados, así el top-k sobre el subconjunto desempata igual que sobre la ciudad entera.
+    - barrio_en_punto: candidatos por caja desde la rejilla y point-in-polygon exacto solo con esos.
+    """
+
+    def __init__(self, centroides: np.ndarray, bboxes: np.ndarray):
+        self.lats = np.ascontiguousarray(centroides[:, 0], dtype=np.float64)
+        self.lons = np.ascontiguousarray(centroides[:, 1], dtype=np.float64)
+        self.bboxes = np.asarray(bboxes, dtype=np.float64)
+        n = len(self.lats)
+
+        if n:
+            extension = [min(self.bboxes[:, 0].min(), self.lons.min()), min(self.bboxes[:, 1].min(), self.lats.min()),
+                         max(self.bboxes[:, 2].max(), self.lons.max()), max(self.bboxes[:, 3].max(), self.lats.max())]
+        else:
+            extension = [0.0, 0.0, 1.0, 1.0]
+        lado = max(1, int(math.ceil(math.sqrt(n / OBJETIVO_POR_CELDA))))
+
+        rejilla = _Rejilla(extension, lado)
+        self._centroides = _Celdas(rejilla, self.lons, self.lats, self.lons, self.lats)
+        self._cajas = _Celdas(rejilla, *self.bboxes.reshape(n, 4).T)
+        # Anillos ya convertidos a arrays de los barrios consultados por punto (se rellena al usarse)
+        self._poligonos: Dict[int, List[List[np.ndarray]]] = {}
+
+    def __len__(self):
+        return len(self.lats)
+
+    # --- FILTROS ---
+    def en_bbox(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> np.ndarray:
+        idx = self._centroides.en_rango(min_lon, min_lat, max_lon, max_lat)
+        lons, lats = self.lons[idx], self.lats[idx]
+        return idx[(lons >= min_lon) & (lons <= max_lon) & (lats >= min_lat) & (lats <= max_lat)]
+
+    def en_radio(self, lat: float, lon: float, radio_km: float) -> np.ndarray:
+        d_lat = radio_km / KM_POR_GRADO
+        d_lon = radio_km / (KM_POR_GRADO * max(math.cos(math.radians(lat)), 1e-6))
+        idx = self.en_bbox(lon - d_lon, lat - d_lat, lon + d_lon, lat + d_lat)
+        return idx[distancia_km(lat, lon, self.lats[idx], self.lons[idx]) <= radio_km]
+
+    def en_poligono(self, anillo: Sequence[Sequence[float]]) -> np.ndarray:
+        """anillo: [[lon, lat], ...] como en GeoJSON."""
+        lons = [p[0] for p in anillo]
+        lats = [p[1] for p in anillo]
+        idx = self.en_bbox(min(lons), min(lats), max(lons), max(lats))
+        return idx[puntos_en_anillo(self.lons[idx], self.lats[idx], anillo)]
+
+    def filtrar(self, bbox: Optional[Sequence[float]] = None, centro: Optional[Dict[str, float]] = None,
+                radio_km: Optional[float] = None,
+                poligono: Optional[Sequence[Sequence[float]]] = None) -> Optional[np.ndarray]:
+        """
+        Intersección de los filtros pedidos, o None si no se pide ninguno (toda la ciudad).
+        Lanza ValueError si un filtro está mal formado.
+        """
+        candidatos = None
+
+        def combinar(actual, nuevos):
+            return nuevos if actual is None else np.intersect1d(actual, nuevos, assume_unique=True)
+
+        if bbox is not None:
+            if len(bbox) != 4:
+                raise ValueError("bbox debe ser [min_lon, min_lat, max_lon, max_lat]")
+            candidatos = combinar(candidatos, self.en_bbox(*bbox))
+        if radio_km is not None or centro is not None:
+            if radio_km is None or centro is None or radio_km < 0:
+                raise ValueError("el filtro por radio necesita centro y radio_km >= 0")
+            candidatos = combinar(candidatos, self.en_radio(centro["lat"], centro["lon"], radio_km))
+        if poligono is not None:
+            if len(poligono) < 3 or any(len(p) < 2 for p in poligono):
+                raise ValueError("poligono debe tener al menos 3 puntos [lon, lat]")
+            candidatos = combinar(candidatos, self.en_poligono(poligono))
+        return candidatos
+
+    # --- CONSULTA POR PUNTO ---
+    def barrio_en_punto(self, lat: float, lon: float, geometrias: Sequence[Optional[Dict[str, Any]]]) -> Optional[int]:
+        """Índice del barrio cuyo polígono contiene el punto (el primero si se solapan)."""
+        for i in self._cajas.en_rango(lon, lat, lon, lat).tolist():
+            x0, y0, x1, y1 = self.bboxes[i]
+            if not (x0 <= lon <= x1 and y0 <= lat <= y1):
+                continue
+            poligonos = self._poligonos.get(i)
+            if poligonos is None:
+                poligonos = self._poligonos[i] = poligonos_np(geometrias[i])
+            if punto_en_poligonos(lon, lat, poligonos):
+                return i
+        return None
+
+
+def calcular_bboxes(locations: Sequence[Dict[str, float]],
+                    geometrias: Sequence[Optional[Dict[str, Any]]]) -> np.ndarray:
+    """Caja de cada barrio; los que no tienen polígono se quedan con una caja degenerada en su centroide."""
+    bboxes = np.empty((len(locations), 4), dtype=np.float64)
+    for i, (loc, geo) in enumerate(zip(locations, geometrias)):
+        bboxes[i] = bbox_geometria(geo) or [loc["lon"], loc["lat"], loc["lon"], loc["lat"]]
+    return bboxes
+
+
+def centroides_de(locations: Sequence[Dict[str, float]]) -> np.ndarray:
+    return np.array([[loc["lat"], loc["lon"]] for loc in locations], dtype=np.float64).reshape(len(locations), 2)
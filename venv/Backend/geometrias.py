@@ -0,0 +1,196 @@
+import gzip
+import hashlib
+import json
+import mmap
+import os
+from typing import Dict, List, Any, Optional, Sequence
+from fastapi import Response
+
+# Tolerancia de simplificación (en grados) por nivel. 0 = geometría original.
+# El frontend elige el nivel según el zoom del mapa: cerca -> 0, ciudad -> 1, área metropolitana -> 2.
+NIVELES_SIMPLIFICACION = {0: 0.0, 1: 0.0002, 2: 0.001}
+
+# no-cache: el navegador guarda la respuesta pero la revalida siempre con If-None-Match (304 sin cuerpo si
+# no ha cambiado). Con un max-age la reutilizaría sin preguntar y tras una recarga del dataset seguiría
+# pintando polígonos viejos o sin los barrios nuevos
+CACHE_CONTROL = "no-cache"
+
+
+# === SIMPLIFICACIÓN (DOUGLAS-PEUCKER) ===
+def _distancia_segmento(p, a, b) -> float:
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    if dx == 0 and dy == 0:
+        return ((p[0] - a[0]) ** 2 + (p[1] - a[1]) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / (dx * dx + dy * dy)))
+    px, py = a[0] + t * dx, a[1] + t * dy
+    return ((p[0] - px) ** 2 + (p[1] - py) ** 2) ** 0.5
+
+
+def simplificar_linea(puntos: List[List[float]], tolerancia: float) -> List[List[float]]:
+    """Douglas-Peucker iterativo (sin recursión, para anillos largos)."""
+    if tolerancia <= 0 or len(puntos) < 3:
+        return puntos
+
+    conservar = [False] * len(puntos)
+    conservar[0] = conservar[-1] = True
+    pila = [(0, len(puntos) - 1)]
+
+    while pila:
+        ini, fin = pila.pop()
+        max_d, max_i = 0.0, ini
+        for i in range(ini + 1, fin):
+            d = _distancia_segmento(puntos[i], puntos[ini], puntos[fin])
+            if d > max_d:
+                max_d, max_i = d, i
+        if max_d > tolerancia:
+            conservar[max_i] = True
+            pila.append((ini, max_i))
+            pila.append((max_i, fin))
+
+    return [p for p, ok in zip(puntos, conservar) if ok]
+
+
+def _simplificar_anillo(anillo: List[List[float]], tolerancia: float) -> List[List[float]]:
+    simplificado = simplificar_linea(anillo, tolerancia)
+    # Un anillo válido necesita al menos 4 puntos (cerrado); si colapsa, nos quedamos el original
+    return simplificado if len(simplificado) >= 4 else anillo
+
+
+def simplificar_geometria(geometry: Optional[Dict[str, Any]], tolerancia: float) -> Optional[Dict[str, Any]]:
+    if not geometry or tolerancia <= 0:
+        return geometry
+
+    tipo = geometry.get("type")
+    coords = geometry.get("coordinates")
+    if tipo == "Polygon":
+        coords = [_simplificar_anillo(anillo, tolerancia) for anillo in coords]
+    elif tipo == "MultiPolygon":
+        coords = [[_simplificar_anillo(anillo, tolerancia) for anillo in poligono] for poligono in coords]
+    else:
+        return geometry
+
+    return {"type": tipo, "coordinates": coords}
+
+
+# === ALMACÉN PRE-SERIALIZADO ===
+def serializar_nivel(ids: Sequence[str], nombres: Sequence[str], geometrias: Sequence[Optional[Dict[str, Any]]],
+                     tolerancia: float) -> bytes:
+    features = [
+        {
+            "type": "Feature",
+            "id": bid,
+            "properties": {"barrio_id": bid, "nombre": nombre},
+            "geometry": simplificar_geometria(geo, tolerancia),
+        }
+        for bid, nombre, geo in zip(ids, nombres, geometrias)
+        if geo
+    ]
+    return json.dumps({"type": "FeatureCollection", "features": features}, separators=(",", ":")).encode("utf-8")
+
+
+def _mapear(ruta: str) -> mmap.mmap:
+    with open(ruta, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class GeometriaSerializada:
+    """
+    FeatureCollection de un nivel ya serializada en disco (JSON y gzip) con su ETag.
+    Cada codificación es una representación distinta y lleva su propio ETag fuerte (RFC 9110).
+    Los ficheros se mapean al cargar el snapshot y no se vuelven a abrir por ruta: si otro proceso
+    borra el snapshot (limpiar_snapshots), este worker los sigue sirviendo hasta que recargue.
+    """
+
+    def __init__(self, ruta: str, ruta_gzip: str, etag: str):
+        self.ruta = ruta
+        self.ruta_gzip = ruta_gzip
+        self.cuerpo = memoryview(_mapear(ruta))
+        self.cuerpo_gzip = memoryview(_mapear(ruta_gzip))
+        self.etag = etag
+        self.etag_gzip = etag[:-1] + '-gzip"'
+
+
+class AlmacenGeometrias:
+    """
+    Polígonos de todos los barrios simplificados y serializados una sola vez (al compilar el snapshot).
+    Los endpoints sirven los ficheros mapeados tal cual, sin copiarlos ni pasar por Pydantic; al vivir
+    en la caché de páginas del SO, todos los workers comparten la misma copia.
+    """
+
+    def __init__(self, niveles: Dict[int, GeometriaSerializada]):
+        self.niveles = niveles
+
+    @staticmethod
+    def escribir(directorio: str, ids: Sequence[str], nombres: Sequence[str],
+                 geometrias: Sequence[Optional[Dict[str, Any]]]) -> Dict[int, str]:
+        """Escribe geometrias_<nivel>.json(.gz) en el directorio y devuelve el ETag de cada nivel."""
+        etags = {}
+        for nivel, tolerancia in NIVELES_SIMPLIFICACION.items():
+            cuerpo = serializar_nivel(ids, nombres, geometrias, tolerancia)
+            with open(os.path.join(directorio, f"geometrias_{nivel}.json"), "wb") as f:
+                f.write(cuerpo)
+            with open(os.path.join(directorio, f"geometrias_{nivel}.json.gz"), "wb") as f:
+                f.write(gzip.compress(cuerpo, compresslevel=9))
+            etags[nivel] = '"' + hashlib.sha1(cuerpo).hexdigest() + '"'
+        return etags
+
+    @classmethod
+    def desde_directorio(cls, directorio: str, etags: Dict[int, str]) -> "AlmacenGeometrias":
+        return cls({
+            int(nivel): GeometriaSerializada(
+                os.path.join(directorio, f"geometrias_{nivel}.json"),
+                os.path.join(directorio, f"geometrias_{nivel}.json.gz"),
+                etag,
+            )
+            for nivel, etag in etags.items()
+        })
+
+    def nivel(self, nivel: int) -> GeometriaSerializada:
+        # Niveles fuera de rango se ajustan al más cercano disponible
+        nivel = max(min(self.niveles), min(max(self.niveles), nivel))
+        return self.niveles[nivel]
+
+
+def acepta_gzip(accept_encoding: Optional[str]) -> bool:
+    """gzip con q > 0 en Accept-Encoding (explícito o vía *). "gzip;q=0" significa que no."""
+    calidades = {}
+    for parte in (accept_encoding or "").split(","):
+        codificacion, *params = [p.strip() for p in parte.split(";")]
+        q = 1.0
+        for param in params:
+            nombre, _, valor = param.partition("=")
+            if nombre.strip().lower() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        if codificacion:
+            calidades[codificacion.lower()] = q
+
+    return calidades.get("gzip", calidades.get("*", 0.0)) > 0
+
+
+def coincide_etag(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (ignora W/), con soporte de "*"."""
+    if not if_none_match:
+        return False
+    etiquetas = [e.strip() for e in if_none_match.split(",")]
+    return "*" in etiquetas or etag in [e[2:] if e.startswith("W/") else e for e in etiquetas]
+
+
+def respuesta_geometrias(almacen: AlmacenGeometrias, nivel: int, if_none_match: Optional[str],
+                         accept_encoding: Optional[str]) -> Response:
+    """Respuesta cacheable: ETag + Cache-Control, 304 si el cliente ya la tiene, gzip si lo acepta."""
+    geo = almacen.nivel(nivel)
+    gzip_ok = acepta_gzip(accept_encoding)
+    etag = geo.etag_gzip if gzip_ok else geo.etag
+    cabeceras = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+    if coincide_etag(if_none_match, etag):
+        return Response(status_code=304, headers=cabeceras)
+
+    if gzip_ok:
+        cabeceras["Content-Encoding"] = "gzip"
+        return Response(geo.cuerpo_gzip, media_type="application/geo+json", headers=cabeceras)
+
+    return Response(geo.cuerpo, media_type="application/geo+json", headers=cabeceras)
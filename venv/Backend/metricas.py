@@ -0,0 +1,181 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Límites (segundos) de los histogramas de latencia
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+# (nombre, tipo, ayuda, etiquetas, valor) que aporta un recolector en cada /metrics
+Muestra = Tuple[str, str, str, Dict[str, str], float]
+
+
+def _etiquetas(labels: Dict[str, str]) -> Etiquetas:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _formato(etiquetas: Iterable[Tuple[str, str]]) -> str:
+    partes = [f'{k}="{v}"' for k, v in etiquetas]
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+# === REGISTRO (FORMATO PROMETHEUS) ===
+class Metricas:
+    """
+    Contadores e histogramas en memoria del proceso, expuestos en formato texto de Prometheus.
+    Los valores que ya llevan otros objetos (caché del LLM, vistas de sub-pesos) no se duplican:
+    se leen en cada /metrics con recolectores.
+    """
+
+    def __init__(self, prefijo: str = "barrios"):
+        self.prefijo = prefijo
+        self._lock = threading.Lock()
+        self._tipos: Dict[str, Tuple[str, str]] = {}
+        self._contadores: Dict[str, Dict[Etiquetas, float]] = {}
+        self._histogramas: Dict[str, Dict[Etiquetas, List[float]]] = {}
+        self._recolectores: List[Callable[[], Iterable[Muestra]]] = []
+
+        # Series que alimentan MiddlewareTiempos y medir()
+        self.contador("peticiones_total", "Peticiones HTTP por ruta y código")
+        self.histograma("peticion_segundos", "Latencia de las peticiones HTTP por ruta")
+        self.histograma("etapa_segundos", "Duración de cada etapa de una petición")
+
+    def contador(self, nombre: str, ayuda: str):
+        self._tipos[nombre] = ("counter", ayuda)
+        self._contadores.setdefault(nombre, {})
+
+    def histograma(self, nombre: str, ayuda: str):
+        self._tipos[nombre] = ("histogram", ayuda)
+        self._histogramas.setdefault(nombre, {})
+
+    def recolector(self, fn: Callable[[], Iterable[Muestra]]):
+        self._recolectores.append(fn)
+
+    def incrementar(self, nombre: str, valor: float = 1.0, **labels: str):
+        clave = _etiquetas(labels)
+        with self._lock:
+            serie = self._contadores[nombre]
+            serie[clave] = serie.get(clave, 0.0) + valor
+
+    def observar(self, nombre: str, segundos: float, **labels: str):
+        clave = _etiquetas(labels)
+        with self._lock:
+            # [cuenta por bucket..., +Inf, suma]
+            h = self._histogramas[nombre].setdefault(clave, [0.0] * (len(BUCKETS) + 2))
+            for i, limite in enumerate(BUCKETS):
+                if segundos <= limite:
+                    h[i] += 1
+            h[-2] += 1
+            h[-1] += segundos
+
+    def exponer(self) -> str:
+        lineas = []
+
+        def cabecera(nombre, tipo, ayuda):
+            lineas.append(f"# HELP {self.prefijo}_{nombre} {ayuda}")
+            lineas.append(f"# TYPE {self.prefijo}_{nombre} {tipo}")
+
+        with self._lock:
+            contadores = {n: dict(s) for n, s in self._contadores.items()}
+            histogramas = {n: {k: list(v) for k, v in s.items()} for n, s in self._histogramas.items()}
+
+        for nombre, serie in contadores.items():
+            cabecera(nombre, *self._tipos[nombre])
+            for clave, valor in sorted(serie.items()):
+                lineas.append(f"{self.prefijo}_{nombre}{_formato(clave)} {valor:g}")
+
+        for nombre, serie in histogramas.items():
+            cabecera(nombre, *self._tipos[nombre])
+            for clave, h in sorted(serie.items()):
+                for limite, n in zip(BUCKETS, h):
+                    lineas.append(f"{self.prefijo}_{nombre}_bucket{_formato(clave + (('le', f'{limite:g}'),))} {n:g}")
+                lineas.append(f"{self.prefijo}_{nombre}_bucket{_formato(clave + (('le', '+Inf'),))} {h[-2]:g}")
+                lineas.append(f"{self.prefijo}_{nombre}_sum{_formato(clave)} {h[-1]:.6f}")
+                lineas.append(f"{self.prefijo}_{nombre}_count{_formato(clave)} {h[-2]:g}")
+
+        vistos = set()
+        for fn in self._recolectores:
+            for nombre, tipo, ayuda, labels, valor in fn():
+                if nombre not in vistos:
+                    cabecera(nombre, tipo, ayuda)
+                    vistos.add(nombre)
+                lineas.append(f"{self.prefijo}_{nombre}{_formato(_etiquetas(labels))} {valor:g}")
+
+        return "\n".join(lineas) + "\n"
+
+
+# === ETAPAS POR PETICIÓN ===
+# (registro, {etapa: segundos}) de la petición en curso; lo fija el middleware
+_PETICION: contextvars.ContextVar[Optional[Tuple[Metricas, Dict[str, float]]]] = \
+    contextvars.ContextVar("peticion_metricas", default=None)
+
+
+@contextmanager
+def medir(etapa: str):
+    """
+    Cronometra una etapa de la petición en curso (llm, palabras_clave, puntuacion...).
+    Va al histograma de etapas y a la cabecera Server-Timing. Fuera de una petición no hace nada.
+    """
+    actual = _PETICION.get()
+    if actual is None:
+        yield
+        return
+
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dur = time.perf_counter() - t0
+        metricas, etapas = actual
+        etapas[etapa] = etapas.get(etapa, 0.0) + dur
+        metricas.observar("etapa_segundos", dur, etapa=etapa)
+
+
+class MiddlewareTiempos:
+    """
+    Middleware ASGI: abre el registro de etapas de cada petición y, al empezar la respuesta, añade
+    Server-Timing con las etapas medidas (los endpoints de recomendación miden también
+    "serializacion": construir los modelos de respuesta y pasarlos a JSON), "resto" (lo que queda
+    fuera de toda etapa: leer y validar el cuerpo, pasar al threadpool, el middleware) y el total.
+    También anota la latencia y el código por ruta; las rutas desconocidas se agrupan en "otras".
+    """
+
+    def __init__(self, app, metricas: Metricas, rutas: Callable[[], Iterable[str]]):
+        self.app = app
+        self.metricas = metricas
+        self._rutas = rutas
+        self._conocidas: Optional[set] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._conocidas is None:
+            self._conocidas = set(self._rutas())
+        ruta = scope["path"] if scope["path"] in self._conocidas else "otras"
+
+        etapas: Dict[str, float] = {}
+        token = _PETICION.set((self.metricas, etapas))
+        t0 = time.perf_counter()
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                total = time.perf_counter() - t0
+                if etapas:
+                    etapas["resto"] = max(0.0, total - sum(etapas.values()))
+                    self.metricas.observar("etapa_segundos", etapas["resto"], etapa="resto")
+                etapas["total"] = total
+                valor = ", ".join(f"{nombre};dur={seg * 1000:.2f}" for nombre, seg in etapas.items())
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [(b"server-timing", valor.encode("latin-1"))]
+
+                self.metricas.observar("peticion_segundos", total, ruta=ruta)
+                self.metricas.incrementar("peticiones_total", ruta=ruta, codigo=str(mensaje["status"]))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _PETICION.reset(token)
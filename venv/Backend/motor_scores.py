@@ -0,0 +1,292 @@
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Any, Iterable, Optional, Sequence, Tuple
+
+LOCATION_DEFECTO = {"lat": 34.05, "lon": -118.24}
+
+# Tope de elementos (lote x barrios x variables) por bloque en el modo objetivo por lotes,
+# para no reservar matrices 3D gigantes cuando llegan muchas prefs a la vez.
+MAX_ELEMENTOS_BLOQUE = 4_000_000
+
+# Nº de combinaciones distintas de sub-pesos cuyas matrices derivadas se guardan en memoria
+MAX_VISTAS_CACHE = 128
+# ... y memoria total que pueden ocupar: cada vista lleva sus coords y hasta dos matrices rellenas,
+# así que con muchos barrios caben menos (con 100k barrios, ~7 MB por vista)
+MAX_BYTES_VISTAS_CACHE = 64 * 2**20
+
+# Clave hashable de unos sub-pesos: ((categoria, sub_variable, peso), ...) ordenada
+ClaveSubPesos = Tuple[Tuple[str, str, float], ...]
+
+
+# === SELECCIÓN TOP-K ===
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Índices de los top_k scores ordenados de mayor a menor.
+    Usa argpartition (selección parcial) y solo ordena los k ganadores.
+    En empates se respeta el orden original de los barrios (como el sort estable de antes).
+    """
+    n = scores.shape[0]
+    if top_k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if top_k < n:
+        # Empates en la frontera del top-k: entran los de menor índice (argpartition no lo garantiza)
+        corte = -np.partition(-scores, top_k - 1)[top_k - 1]
+        mayores = np.flatnonzero(scores > corte)
+        iguales = np.flatnonzero(scores == corte)[:top_k - len(mayores)]
+        idx = np.sort(np.concatenate([mayores, iguales]))
+    else:
+        idx = np.arange(n)
+
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def top_k_indices_lote(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Igual que top_k_indices pero fila a fila sobre una matriz (lote x barrios)."""
+    lote, n = scores.shape
+    top_k = min(top_k, n)
+    if top_k <= 0:
+        return np.empty((lote, 0), dtype=np.intp)
+
+    if top_k < n:
+        corte = -np.partition(-scores, top_k - 1, axis=1)[:, top_k - 1, None]
+        mayores = scores > corte
+        iguales = scores == corte
+        faltan = top_k - mayores.sum(axis=1, keepdims=True)
+        # Cada fila queda con exactamente top_k marcados; nonzero los devuelve ya ordenados
+        elegidos = mayores | (iguales & (np.cumsum(iguales, axis=1) <= faltan))
+        idx = np.nonzero(elegidos)[1].reshape(lote, top_k)
+    else:
+        idx = np.tile(np.arange(n), (lote, 1))
+
+    orden = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(idx, orden, axis=1)
+
+
+# === MOTOR ===
+class MotorScores:
+    """
+    Matriz contigua (barrios x variables) construida una sola vez al cargar los barrios.
+    Las coords que faltan se guardan como NaN y cada modo las rellena con su valor por defecto
+    (0.5 en target matching, 0.0 en producto punto).
+    """
+
+    def __init__(self, variables: Sequence[str], ids: List[str], nombres: List[str], coords: np.ndarray,
+                 locations: List[Dict[str, float]], geometrias: List[Optional[Dict[str, Any]]],
+                 sub_variables: Optional[Dict[str, Dict[str, float]]] = None,
+                 sub_tensor: Optional[np.ndarray] = None,
+                 rellenas: Optional[Dict[float, np.ndarray]] = None):
+        self.variables = list(variables)
+        self.ids = ids
+        self.nombres = nombres
+        self.coords = np.ascontiguousarray(coords, dtype=np.float32)
+        self.locations = locations
+        self.geometrias = geometrias
+        # Matrices ya rellenas (p. ej. mapeadas desde un snapshot); si no, se calculan al primer uso
+        self._rellenas: Dict[float, np.ndarray] = dict(rellenas or {})
+
+        # Tensor (barrios x categorías x sub-variables) para recalcular coords con otros pesos.
+        # Las celdas sin dato van a NaN; los huecos de relleno (categorías con menos subs) a 0 peso.
+        self.sub_variables = sub_variables or {}
+        self.sub_tensor = sub_tensor
+        self._vista_con_sub_pesos = lru_cache(maxsize=self.max_vistas_cache())(self._crear_vista)
+
+    def max_vistas_cache(self) -> int:
+        """Vistas por sub-pesos que caben en MAX_BYTES_VISTAS_CACHE (al menos una, como mucho MAX_VISTAS_CACHE)."""
+        por_vista = 3 * self.coords.nbytes  # coords + matriz(0.5) + matriz(0.0)
+        return max(1, min(MAX_VISTAS_CACHE, MAX_BYTES_VISTAS_CACHE // max(1, por_vista)))
+
+    @staticmethod
+    def construir_sub_tensor(docs: List[Dict[str, Any]], variables: Sequence[str],
+                             sub_variables: Dict[str, Dict[str, float]]) -> np.ndarray:
+        max_subs = max((len(subs) for subs in sub_variables.values()), default=0)
+        tensor = np.full((len(docs), len(variables), max_subs), np.nan, dtype=np.float32)
+
+        for i, doc in enumerate(docs):
+            doc_subs = doc.get("sub_coords", {})
+            for j, var in enumerate(variables):
+                valores = doc_subs.get(var, {})
+                for k, sub in enumerate(sub_variables.get(var, {})):
+                    if sub in valores:
+                        tensor[i, j, k] = valores[sub]
+        return tensor
+
+    @classmethod
+    def desde_documentos(cls, docs: Iterable[Dict[str, Any]], variables: Sequence[str],
+                         sub_variables: Optional[Dict[str, Dict[str, float]]] = None) -> "MotorScores":
+        docs = list(docs)
+        coords = np.full((len(docs), len(variables)), np.nan, dtype=np.float32)
+
+        for i, doc in enumerate(docs):
+            doc_coords = doc.get("coords", {})
+            for j, var in enumerate(variables):
+                if var in doc_coords:
+                    coords[i, j] = doc_coords[var]
+
+        return cls(
+            variables,
+            ids=[doc["_id"] for doc in docs],
+            nombres=[doc["nombre"] for doc in docs],
+            coords=coords,
+            locations=[doc.get("location", LOCATION_DEFECTO) for doc in docs],
+            geometrias=[doc.get("geometry") for doc in docs],
+            sub_variables=sub_variables,
+            sub_tensor=cls.construir_sub_tensor(docs, variables, sub_variables) if sub_variables else None,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def matriz(self, valor_defecto: float) -> np.ndarray:
+        """Matriz de coords con los huecos rellenos (se calcula una vez por valor)."""
+        m = self._rellenas.get(valor_defecto)
+        if m is None:
+            m = np.where(np.isnan(self.coords), np.float32(valor_defecto), self.coords)
+            self._rellenas[valor_defecto] = m
+        return m
+
+    # --- SUB-PESOS DEL USUARIO ---
+    def clave_sub_pesos(self, sub_pesos: Optional[Dict[str, Dict[str, float]]]) -> ClaveSubPesos:
+        """
+        Normaliza los sub-pesos a una clave hashable, ignorando categorías/subs desconocidas y los
+        pesos iguales al de por defecto (no cambian nada: las coords guardadas ya usan esos pesos).
+        """
+        if not sub_pesos or self.sub_tensor is None:
+            return ()
+
+        clave = []
+        for cat, pesos in sub_pesos.items():
+            subs_cat = self.sub_variables.get(cat)
+            if cat not in self.variables or not subs_cat:
+                continue
+            for sub, peso in pesos.items():
+                peso = round(max(0.0, float(peso)), 4)
+                if sub in subs_cat and peso != round(subs_cat[sub], 4):
+                    clave.append((cat, sub, peso))
+        return tuple(sorted(clave))
+
+    def con_sub_pesos(self, sub_pesos: Optional[Dict[str, Dict[str, float]]]) -> "MotorScores":
+        """
+        Motor con las coords de las categorías afectadas recalculadas desde sub_coords.
+        Las vistas se cachean (LRU) por vector de pesos: las ponderaciones repetidas no cuestan nada.
+        """
+        clave = self.clave_sub_pesos(sub_pesos)
+        if not clave:
+            return self
+        return self._vista_con_sub_pesos(clave)
+
+    def info_cache_vistas(self):
+        """Aciertos/fallos/tamaño de la caché de vistas por sub-pesos (para /metrics)."""
+        return self._vista_con_sub_pesos.cache_info()
+
+    def _crear_vista(self, clave: ClaveSubPesos) -> "MotorScores":
+        # Pesos (categorías x sub-variables): por defecto + overrides del usuario
+        pesos = np.zeros(self.sub_tensor.shape[1:], dtype=np.float32)
+        for j, var in enumerate(self.variables):
+            for k, peso in enumerate(self.sub_variables.get(var, {}).values()):
+                pesos[j, k] = peso
+
+        tocadas = set()
+        for cat, sub, peso in clave:
+            j = self.variables.index(cat)
+            pesos[j, list(self.sub_variables[cat]).index(sub)] = peso
+            tocadas.add(j)
+        tocadas = sorted(tocadas)
+
+        # Media ponderada de las sub-variables con dato, solo en las categorías tocadas
+        sub = self.sub_tensor[:, tocadas, :]
+        w = np.where(np.isnan(sub), np.float32(0.0), pesos[tocadas])
+        suma_pesos = w.sum(axis=2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            recalculadas = np.nansum(sub * w, axis=2) / suma_pesos
+        # Sin ningún peso sobre los datos del barrio la categoría es desconocida (NaN: cada modo la
+        # rellena como indiferente), no 0.0, que haría que un objetivo "barato" casara con todos
+        recalculadas[suma_pesos == 0] = np.nan
+
+        # Barrios sin sub_coords en esa categoría mantienen la coord guardada, salvo que el usuario
+        # haya puesto a 0 todos los pesos de la categoría: entonces es desconocida para todos
+        sin_datos = np.isnan(sub).all(axis=2) & (pesos[tocadas].sum(axis=1) > 0)
+        coords = self.coords.copy()
+        coords[:, tocadas] = np.where(sin_datos, coords[:, tocadas], recalculadas)
+
+        return MotorScores(self.variables, self.ids, self.nombres, coords, self.locations, self.geometrias)
+
+    def vector(self, prefs: Dict[str, float], valor_defecto: float) -> np.ndarray:
+        return np.array([prefs.get(v, valor_defecto) for v in self.variables], dtype=np.float32)
+
+    # --- MODO OBJETIVO (api.py) ---
+    def puntuar_objetivo(self, prefs: Dict[str, float],
+                         candidatos: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Similitud media 1 - |objetivo - valor| sobre las variables activas (objetivo >= 0).
+        Con candidatos (p. ej. de un filtro espacial) solo se puntúan esas filas, en ese orden.
+        Devuelve None si no hay ninguna variable activa.
+        """
+        objetivo = self.vector(prefs, -1.0)
+        activas = objetivo >= 0.0
+        if not activas.any():
+            return None
+
+        x = self.matriz(0.5)
+        x = x[:, activas] if candidatos is None else x[np.ix_(candidatos, activas)]
+        return 1.0 - np.abs(x - objetivo[activas]).mean(axis=1)
+
+    def puntuar_objetivo_lote(self, lista_prefs: List[Dict[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Matriz (lote x barrios) con el score de cada vector de prefs, y máscara de filas válidas
+        (con alguna variable activa). El valor absoluto impide reducirlo a un único producto de
+        matrices, así que se hace por broadcasting en bloques.
+        """
+        objetivos = np.array([self.vector(p, -1.0) for p in lista_prefs], dtype=np.float32)
+        objetivos = objetivos.reshape(len(lista_prefs), len(self.variables))
+        activas = (objetivos >= 0.0).astype(np.float32)
+        n_activas = activas.sum(axis=1)
+
+        x = self.matriz(0.5)
+        scores = np.zeros((len(lista_prefs), len(self)), dtype=np.float32)
+        bloque = max(1, MAX_ELEMENTOS_BLOQUE // max(1, x.size))
+
+        for ini in range(0, len(lista_prefs), bloque):
+            fin = ini + bloque
+            dif = np.abs(x[None, :, :] - objetivos[ini:fin, None, :])
+            dif_total = np.einsum("bnv,bv->bn", dif, activas[ini:fin])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores[ini:fin] = 1.0 - dif_total / n_activas[ini:fin, None]
+
+        validas = n_activas > 0
+        scores[~validas] = 0.0
+        return scores, validas
+
+    # --- MODO PESOS (barrios_store.py) ---
+    def puntuar_pesos(self, prefs: Dict[str, float], candidatos: Optional[np.ndarray] = None) -> np.ndarray:
+        """Producto punto coords x pesos del usuario (solo las filas candidatas, si se pasan)."""
+        x = self.matriz(0.0)
+        return (x if candidatos is None else x[candidatos]) @ self.vector(prefs, 0.0)
+
+    def puntuar_pesos_lote(self, lista_prefs: List[Dict[str, float]]) -> np.ndarray:
+        """Todos los vectores de pesos en una sola multiplicación de matrices (lote x barrios)."""
+        pesos = np.array([self.vector(p, 0.0) for p in lista_prefs], dtype=np.float32)
+        pesos = pesos.reshape(len(lista_prefs), len(self.variables))
+        return pesos @ self.matriz(0.0).T
+
+    # --- SALIDA ---
+    def coords_de(self, i: int) -> Dict[str, float]:
+        return {v: float(x) for v, x in zip(self.variables, self.coords[i]) if not np.isnan(x)}
+
+    def resultados(self, indices: np.ndarray, scores: np.ndarray,
+                   incluir_geometria: bool = True) -> List[Dict[str, Any]]:
+        """
+        Construye los dicts de salida solo para los barrios ganadores (scores alineados con indices).
+        Sin geometría, el frontend la toma del endpoint de geometrías (cacheado).
+        """
+        return [
+            {
+                "barrio_id": self.ids[i],
+                "nombre": self.nombres[i],
+                "score": float(score),
+                "coords": self.coords_de(i),
+                "location": self.locations[i],
+                "geometry": self.geometrias[i] if incluir_geometria else None,
+            }
+            for i, score in zip(indices, scores)
+        ]
@@ -0,0 +1,215 @@
+import bisect
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Any, Sequence, Tuple
+
+RUTA_REGLAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reglas_palabras_clave.json")
+# Cada cuántos segundos se mira como mucho si el fichero de reglas ha cambiado (0 = en cada análisis)
+RECARGA_REGLAS_INTERVALO = float(os.getenv("RECARGA_REGLAS_INTERVALO", "5"))
+
+# La negación no cruza signos de puntuación ni un "pero" ("sin tráfico, barato" no niega "barato")
+FIN_NEGACION = re.compile(r"[,.;:!?]|\bpero\b")
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin tildes ni diacríticos y con espacios colapsados ("Económico  YA" -> "economico ya")."""
+    texto = texto.lower()
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return " ".join(texto.split())
+
+
+def _regex_trie(palabras: Sequence[str]) -> str:
+    """
+    Regex con forma de trie: "bar(?:ato|es)" en vez de "barato|bares".
+    El coste por posición depende de la longitud de la palabra, no del tamaño del vocabulario.
+    Las ramas terminales son opcionales y voraces, así que en cada posición gana la palabra más larga.
+    """
+    trie: Dict[str, Any] = {}
+    for palabra in palabras:
+        nodo = trie
+        for c in palabra:
+            nodo = nodo.setdefault(c, {})
+        nodo[""] = {}
+
+    def construir(nodo: Dict[str, Any]) -> str:
+        hijos = [re.escape(c) + construir(sub) for c, sub in sorted(nodo.items()) if c]
+        if not hijos:
+            return ""
+        alternativas = hijos[0] if len(hijos) == 1 else "(?:" + "|".join(hijos) + ")"
+        return "(?:" + alternativas + ")?" if "" in nodo else alternativas
+
+    return construir(trie)
+
+
+# === TABLA COMPILADA ===
+class ReglasCompiladas:
+    """
+    Una sección de la tabla (objetivos o pesos) compilada en un único matcher de una pasada.
+    Cada coincidencia se traduce a las reglas que la contienen (incluidas las palabras que son
+    prefijo de la encontrada), así que el resultado equivale a buscar cada palabra como substring.
+    """
+
+    def __init__(self, reglas: List[Dict[str, Any]], negaciones: Sequence[str], ventana_negacion: int):
+        self.reglas: List[Dict[str, float]] = [dict(r["variables"]) for r in reglas]
+        # Objetivos de la regla cuando solo aparece negada; sin "negadas", la regla negada no fija nada
+        self.negadas: List[Dict[str, float]] = [dict(r.get("negadas", {})) for r in reglas]
+        self.ventana_negacion = ventana_negacion
+
+        reglas_por_palabra: Dict[str, set] = {}
+        for i, regla in enumerate(reglas):
+            for palabra in regla["palabras"]:
+                reglas_por_palabra.setdefault(normalizar(palabra), set()).add(i)
+
+        # Cada palabra hereda las reglas de las palabras que son prefijo suyo: en cada posición el
+        # matcher solo devuelve la más larga ("barato"), pero "bar" también ha aparecido
+        self._reglas_de: Dict[str, Tuple[int, ...]] = {}
+        for palabra in reglas_por_palabra:
+            indices = set()
+            for fin in range(1, len(palabra) + 1):
+                indices |= reglas_por_palabra.get(palabra[:fin], set())
+            self._reglas_de[palabra] = tuple(sorted(indices))
+
+        self.n_palabras = len(reglas_por_palabra)
+        # Lookahead: encuentra coincidencias en todas las posiciones, aunque se solapen ("inseguro"/"seguro")
+        self._patron = (
+            re.compile("(?=(" + _regex_trie(list(reglas_por_palabra)) + "))") if reglas_por_palabra else None
+        )
+
+        negaciones = sorted({normalizar(n) for n in negaciones}, key=len, reverse=True)
+        self._patron_negacion = (
+            re.compile(r"\b(?:" + "|".join(re.escape(n) for n in negaciones) + r")\b") if negaciones else None
+        )
+
+    def coincidencias(self, texto: str) -> Tuple[set, set]:
+        """Reglas activadas en el texto normalizado: (afirmadas, solo negadas)."""
+        if self._patron is None:
+            return set(), set()
+
+        fines_negacion = [m.end() for m in self._patron_negacion.finditer(texto)] if self._patron_negacion else []
+
+        # Ocurrencias de cada palabra en todo el texto (findall y Counter trabajan en C)
+        ocurrencias = Counter(self._patron.findall(texto))
+        if not ocurrencias:
+            return set(), set()
+
+        # Con negaciones, las posiciones de las coincidencias se sacan una sola vez y cada ventana se
+        # localiza por bisección: el coste no crece con negaciones x longitud del texto
+        inicios: List[int] = []
+        palabras: List[str] = []
+        if fines_negacion:
+            for m in self._patron.finditer(texto):
+                inicios.append(m.start())
+                palabras.append(m.group(1))
+
+        negadas_en: Dict[int, str] = {}
+        for fin_neg in fines_negacion:
+            limite = fin_neg - 1
+            for _ in range(self.ventana_negacion + 1):
+                limite = texto.find(" ", limite + 1)
+                if limite < 0:
+                    limite = len(texto)
+                    break
+            corte = FIN_NEGACION.search(texto, fin_neg, limite)
+            if corte:
+                limite = corte.start()
+            for j in range(bisect.bisect_left(inicios, fin_neg), bisect.bisect_right(inicios, limite)):
+                negadas_en[inicios[j]] = palabras[j]
+        ocurrencias_negadas = Counter(negadas_en.values())
+
+        # Una regla está afirmada si alguna de sus palabras aparece al menos una vez sin negar
+        afirmadas, negadas = set(), set()
+        for palabra, n in ocurrencias.items():
+            (afirmadas if n > ocurrencias_negadas[palabra] else negadas).update(self._reglas_de[palabra])
+
+        return afirmadas, negadas - afirmadas
+
+
+# === MOTOR RECARGABLE ===
+class MotorPalabrasClave:
+    """
+    Análisis por palabras clave guiado por datos (reglas_palabras_clave.json).
+
+    - "objetivos" (api.py): todo empieza a -1.0 (ignorar) y cada regla activada fija el objetivo
+      de sus variables; en conflicto gana la última regla de la tabla. Si la regla solo aparece
+      negada ("odio la fiesta") se aplican sus objetivos "negadas" ({"ocio": 0.0}); las reglas sin
+      "negadas" no fijan nada al negarse ("odio el lujo" no pide un barrio inseguro).
+    - "pesos" (barrios_store.py): todo empieza a 0.0 y cada regla activada suma sus pesos una vez.
+      Aquí la negación no cambia nada: mencionar algo, aunque sea para evitarlo, lo hace importante.
+
+    Recarga: como el dataset, la señal compartida entre workers es el propio fichero. Cada worker
+    mira su fecha de modificación (como mucho cada RECARGA_REGLAS_INTERVALO segundos) y, si ha
+    cambiado, lo relee y sustituye la tabla compilada de golpe. recargar() lo fuerza al momento.
+    """
+
+    def __init__(self, seccion: str, ruta: str = RUTA_REGLAS, intervalo: float = RECARGA_REGLAS_INTERVALO):
+        self.seccion = seccion
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self._proxima_comprobacion = 0.0
+        self.recargar()
+
+    def _firma(self) -> Tuple[int, int]:
+        st = os.stat(self.ruta)
+        return st.st_mtime_ns, st.st_size
+
+    def comprobar_cambios(self) -> bool:
+        """Relee la tabla si el fichero ha cambiado desde la última carga. Devuelve si ha recargado."""
+        ahora = time.monotonic()
+        if ahora < self._proxima_comprobacion:
+            return False
+        self._proxima_comprobacion = ahora + self.intervalo
+
+        try:
+            if self._firma() == self.firma:
+                return False
+            self.recargar()
+        except (OSError, ValueError, KeyError) as e:
+            # Fichero a medio escribir o inválido: seguimos con la tabla anterior y no lo reintentamos
+            # hasta que vuelva a cambiar
+            print(f"⚠️ No se pudieron recargar las reglas de {os.path.basename(self.ruta)}: {e}")
+            try:
+                self.firma = self._firma()
+            except OSError:
+                pass
+            return False
+        return True
+
+    def recargar(self) -> int:
+        firma = self._firma()
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            tabla = json.load(f)
+
+        # En modo pesos la negación no se usa: nos ahorramos buscarla
+        negaciones = tabla.get("negaciones", []) if self.seccion == "objetivos" else []
+        compiladas = ReglasCompiladas(tabla[self.seccion], negaciones, tabla.get("ventana_negacion", 3))
+
+        # Sustitución atómica: las peticiones en curso terminan con la tabla anterior
+        self.compiladas = compiladas
+        self.firma = firma
+        return compiladas.n_palabras
+
+    def analizar(self, texto: str, variables: Sequence[str]) -> Dict[str, float]:
+        self.comprobar_cambios()
+        compiladas = self.compiladas
+        afirmadas, negadas = compiladas.coincidencias(normalizar(texto))
+
+        if self.seccion == "pesos":
+            scores = {v: 0.0 for v in variables}
+            for i in sorted(afirmadas):
+                for var, peso in compiladas.reglas[i].items():
+                    if var in scores:
+                        scores[var] += peso
+            return scores
+
+        scores = {v: -1.0 for v in variables}
+        for i in sorted(afirmadas | negadas):
+            objetivos = compiladas.reglas[i] if i in afirmadas else compiladas.negadas[i]
+            for var, objetivo in objetivos.items():
+                if var in scores:
+                    scores[var] = objetivo
+        return scores
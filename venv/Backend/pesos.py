@@ -0,0 +1,23 @@
+# --- PESOS POR DEFECTO DE LAS SUB-VARIABLES (por categoría) ---
+# Compartidos por el seed (índice global inicial) y la API (recálculo con pesos del usuario).
+DEFAULT_WEIGHTS = {
+    "transporte": {
+        "metro": 0.37, "bus": 0.23, "taxi": 0.11, "aeropuerto": 0.29
+    },
+    "ocio": {
+        "cine": 0.21, "gimnasio": 0.15, "bares": 0.23, "parque": 0.18, "restaurante": 0.23
+    },
+    "salut": {
+        "aire": 0.25, "hospital": 0.34, "verde": 0.28, "sonido": 0.23
+    },
+    "seguridad": {
+        "robos_sin": 0.07, "robos_con": 0.31, "allanamiento": 0.19,
+        "asalto": 0.15, "vandalismo": 0.03, "amenaza": 0.25
+    },
+    "densidad_poblacion": {
+        "centro": 0.45, "residencial": 0.275, "infantil": 0.275
+    },
+    "precio": {
+        "vivienda": 0.4, "alquiler": 0.4, "prevision": 0.2
+    }
+}
@@ -0,0 +1,467 @@
+import argparse
+import csv
+import difflib
+import hashlib
+import heapq
+import json
+import math
+import os
+import sys
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import requests
+from pymongo import MongoClient, ReplaceOne, DeleteMany
+
+try:
+    from Backend.espacial import centroide_geometria
+    from Backend.pesos import DEFAULT_WEIGHTS
+except ImportError:  # ejecutado como script desde Backend/
+    from espacial import centroide_geometria
+    from pesos import DEFAULT_WEIGHTS
+
+# --- CONFIGURACIÓN ---
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME = "joc_de_barris"
+COL_BARRIOS = "barrios"
+COL_META = "meta"
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GEOJSON_FILE = os.path.join(BASE_DIR, "LA_Times_Neighborhood_Boundaries.geojson")
+
+TAM_LOTE = 500
+CAMPO_HASH = "hash_contenido"
+
+# --- MAPEO DE COLUMNAS CSV A VARIABLES INTERNAS ---
+# Asocia el nombre de la columna en tus CSVs con la clave interna
+COLUMN_MAPPING = {
+    # Transporte
+    "num_estaciones_bus": "bus",
+    "tiene_metro": "metro",
+    "disponibilidad_taxi": "taxi",
+    "cercania_aeropuerto": "aeropuerto",
+
+    # Ocio
+    "cines_score": "cine", "gimnasios_score": "gimnasio",
+    "parques_score": "parque", "restaurantes_score": "restaurante",  "bares_score": "bares",
+
+    # Salud
+    "calidad_aire": "aire", "aire": "aire", "calidad_aire_normalizada": "aire",
+    "hospitales": "hospital", "hospital": "hospital", "acceso_salud": "hospital",
+    "zonas_verdes": "verde", "verde": "verde",
+    "ruido": "sonido", "sonido": "sonido", "silencio": "sonido",
+
+    # Seguridad (Asumiendo nombres del
+    "robbery": "robos_sin",
+    "theft": "robos_con",
+    "vandalism": "vandalismo",
+    "assault": "asalto",
+    "battery": "amenaza",
+    "tresspasing": "allanamiento",
+
+    # Precio
+    "precio_normalizado": "vivienda",
+    "precio_alquiler_normalizado": "alquiler",
+    "crecimiento_normalizado": "prevision",
+
+    # Densidad
+    "densidad_normalizada": "centro",
+    "intensidad_residencial": "residencial",
+    "indice_familia": "infantil",
+}
+
+# Columnas con el nombre del barrio (no son datos)
+COLUMNAS_NOMBRE = ("nombre", "barrio")
+
+# Archivos CSV esperados en la carpeta
+CSV_FILES = {
+    "transporte": "transporte_datos_final.csv",
+    "ocio": "ocio_datos_final.csv",
+    "salut": "salut_datos_final.csv",
+    "seguridad": "seguridad_datos_final.csv",  # Asegúrate que se llame así
+    "densidad_poblacion": "poblacion_datos_final.csv",
+    "precio": "precio_datos_final.csv"
+}
+
+# --- GEOJSON ---
+URLS_POSIBLES = [
+    "https://raw.githubusercontent.com/datadesk/los-angeles-boundaries/master/geojson/neighborhoods.geojson",
+]
+COORDENADAS_BASE = {"Downtown": (34.0407, -118.2468)}
+
+
+def generate_hexagon(lat, lon, r=1.5):
+    coords = []
+    for i in range(6):
+        ang = math.pi / 180 * 60 * i
+        d_lat = (r / 111.0) * math.cos(ang)
+        d_lon = (r / (111.0 * math.cos(math.radians(lat)))) * math.sin(ang)
+        coords.append([lon + d_lon, lat + d_lat])
+    coords.append(coords[0])
+    return [coords]
+
+
+def obtener_geometrias(geojson_file: str = GEOJSON_FILE):
+    data = None
+    if os.path.exists(geojson_file):
+        try:
+            with open(geojson_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except:
+            pass
+
+    if not data:
+        for url in URLS_POSIBLES:
+            try:
+                r = requests.get(url, timeout=15)
+                if r.status_code == 200:
+                    data = r.json()
+                    with open(geojson_file, "w", encoding="utf-8") as f: json.dump(data, f)
+                    break
+            except:
+                pass
+
+    geos = {}
+    names = []
+    if data:
+        for f in data.get("features", []):
+            p = f.get("properties", {})
+            n = p.get("name") or p.get("NAME") or p.get("slug")
+            if n:
+                geos[n] = f.get("geometry")
+                names.append(n)
+    return geos, names
+
+
+def slugify(name): return name.lower().replace(" ", "_").replace("/", "_").replace("-", "_")
+
+
+# === ÍNDICE DE NOMBRES (TRIGRAMAS) ===
+class IndiceNombres:
+    """
+    Emparejado aproximado de nombres CSV -> GeoJSON sin recorrer todos los nombres.
+    Un índice invertido de trigramas preselecciona los pocos nombres que más trigramas comparten
+    con la consulta y solo sobre esos se calcula el ratio de difflib (mismo criterio, umbral y
+    desempate que get_close_matches). Coste por consulta ~ tamaño de las listas de sus trigramas, no n·m.
+    Los trigramas que aparecen en muchísimos nombres ("bar", " 00"...) no discriminan y se
+    saltan siempre que la consulta tenga alguno más raro.
+
+    Es una aproximación de get_close_matches(n=1): nunca devuelve un nombre por debajo del umbral,
+    pero si el mejor no está entre los preseleccionados se queda con otro o con ninguno. Con los
+    nombres reales coincide siempre; con nombres muy deformados (pocas letras, casi sin trigramas
+    en común) a veces no encuentra nada donde difflib sí (~0.2-0.4% de nombres mal escritos al azar).
+    """
+
+    def __init__(self, nombres: Sequence[str], max_candidatos: int = 16):
+        self.nombres = list(dict.fromkeys(nombres))
+        self.max_candidatos = max_candidatos
+        self.max_frecuencia = max(32, len(self.nombres) // 20)
+        self._exactos = {n: n for n in self.nombres}
+        self._indice: Dict[str, List[int]] = {}
+        self._n_trigramas: List[int] = []
+        for i, nombre in enumerate(self.nombres):
+            trigramas = self.trigramas(nombre)
+            self._n_trigramas.append(len(trigramas))
+            for tri in trigramas:
+                self._indice.setdefault(tri, []).append(i)
+
+    @staticmethod
+    def trigramas(nombre: str) -> set:
+        texto = unicodedata.normalize("NFKD", nombre.lower()).encode("ascii", "ignore").decode("ascii")
+        texto = "  " + " ".join("".join(c if c.isalnum() else " " for c in texto).split()) + " "
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+    def buscar(self, nombre: str, cutoff: float = 0.6) -> Optional[str]:
+        if nombre in self._exactos:
+            return nombre
+
+        trigramas = self.trigramas(nombre)
+        listas = [self._indice[tri] for tri in trigramas if tri in self._indice]
+        raras = [lista for lista in listas if len(lista) <= self.max_frecuencia]
+        comunes = Counter()
+        for lista in raras or listas:
+            comunes.update(lista)
+        if not comunes:
+            return None
+
+        # Candidatos por coeficiente de Dice (trigramas comunes sobre el total de ambos nombres)
+        candidatos = heapq.nlargest(self.max_candidatos, comunes,
+                                    key=lambda i: comunes[i] / (len(trigramas) + self._n_trigramas[i]))
+
+        mejor, mejor_ratio = None, cutoff
+        s = difflib.SequenceMatcher()
+        s.set_seq2(nombre)
+        for i in candidatos:
+            candidato = self.nombres[i]
+            s.set_seq1(candidato)
+            if s.real_quick_ratio() < mejor_ratio or s.quick_ratio() < mejor_ratio:
+                continue
+            ratio = s.ratio()
+            # Empates como get_close_matches: gana el nombre mayor
+            if ratio > mejor_ratio or (ratio == mejor_ratio and (mejor is None or candidato > mejor)):
+                mejor, mejor_ratio = candidato, ratio
+        return mejor
+
+
+# --- CARGA DE DATOS ---
+def leer_csv(categoria: str, path: str) -> Tuple[str, Dict[str, Tuple[str, Dict[str, float]]], List[str]]:
+    """
+    Lee un CSV de una categoría: { slug: (nombre, {sub_variable: valor}) } y las columnas que
+    no se han podido mapear a ninguna sub-variable de la categoría.
+    Función de módulo para poder ejecutarse en otro proceso.
+    """
+    filas = {}
+    with open(path, newline='', encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+
+        # El mapeo de columnas se resuelve una vez por fichero, no por fila
+        columnas, no_mapeadas = [], []
+        for col_csv in reader.fieldnames or []:
+            col_norm = col_csv.lower().strip()
+            if col_norm in COLUMNAS_NOMBRE:
+                continue
+            key_interna = COLUMN_MAPPING.get(col_norm)
+            # Solo guardamos si esta sub-variable pertenece a la categoría actual
+            if key_interna in DEFAULT_WEIGHTS[categoria]:
+                columnas.append((col_csv, key_interna))
+            else:
+                no_mapeadas.append(col_csv)
+
+        for row in reader:
+            # Buscar nombre del barrio
+            nombre_raw = row.get("nombre") or row.get("Barrio")
+            if not nombre_raw: continue
+
+            nombre = nombre_raw.strip()
+            bid = slugify(nombre)
+            if bid not in filas: filas[bid] = (nombre, {})
+
+            for col_csv, key_interna in columnas:
+                try:
+                    v = float(row[col_csv])
+                    # Asumimos que el CSV YA VIENE NORMALIZADO (0 a 1)
+                    # Solo protegemos contra errores muy locos
+                    v = max(0.0, min(1.0, v))
+                except:
+                    v = 0.0
+                filas[bid][1][key_interna] = v
+
+    return categoria, filas, no_mapeadas
+
+
+def cargar_datos_completos(directorio: str = BASE_DIR, workers: int = 1, geojson_file: str = GEOJSON_FILE):
+    """
+    Lee todos los CSVs (en paralelo si workers > 1) mientras se carga el GeoJSON, y organiza
+    las sub-variables por barrio y categoría.
+    Devuelve (datos_barrios, columnas no mapeadas por fichero, geos, nombres de geometría).
+    """
+    tareas = []
+    for categoria, filename in CSV_FILES.items():
+        path = os.path.join(directorio, filename)
+        if not os.path.exists(path):
+            print(f"⚠️ Falta archivo: {filename} (Se usarán ceros para {categoria})")
+            continue
+        tareas.append((categoria, path))
+
+    if workers > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tareas))) as pool:
+            futuros = [pool.submit(leer_csv, categoria, path) for categoria, path in tareas]
+            geos, geo_names = obtener_geometrias(geojson_file)
+            leidos = [f.result() for f in futuros]
+    else:
+        leidos = [leer_csv(categoria, path) for categoria, path in tareas]
+        geos, geo_names = obtener_geometrias(geojson_file)
+
+    # Se fusiona en el orden de CSV_FILES: el nombre lo fija el primer fichero que ve el barrio
+    datos_barrios = {}  # Estructura: { "slug": { "nombre": "X", "sub_coords": {...} } }
+    no_mapeadas = {}
+    for categoria, filas, columnas in leidos:
+        if columnas:
+            no_mapeadas[CSV_FILES[categoria]] = columnas
+        for bid, (nombre, valores) in filas.items():
+            if bid not in datos_barrios: datos_barrios[bid] = {"nombre": nombre, "sub_coords": {}}
+            datos_barrios[bid]["sub_coords"].setdefault(categoria, {}).update(valores)
+
+    return datos_barrios, no_mapeadas, geos, geo_names
+
+
+# --- DOCUMENTOS ---
+def hash_documento(doc: Dict[str, Any]) -> str:
+    contenido = {k: v for k, v in doc.items() if k != CAMPO_HASH}
+    return hashlib.sha1(json.dumps(contenido, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def construir_documento(bid: str, data: Dict[str, Any], geos: Dict[str, Any],
+                        indice: Optional[IndiceNombres]) -> Tuple[Dict[str, Any], bool]:
+    """Documento final del barrio y si se ha encontrado su geometría."""
+    nombre = data["nombre"]
+
+    sub_coords = data["sub_coords"]
+    coords_globales = {}  # Aquí guardamos el resultado del cálculo con pesos default
+
+    # --- CÁLCULO DE NOTA GLOBAL ---
+    for cat, pesos_cat in DEFAULT_WEIGHTS.items():
+        valores_reales = sub_coords.setdefault(cat, {})
+
+        suma, suma_pesos = 0.0, 0.0
+
+        for sub_key, peso in pesos_cat.items():
+            valor = valores_reales.get(sub_key, 0.0)
+            sub_coords[cat][sub_key] = valor
+            suma += valor * peso
+            suma_pesos += peso
+
+        # Media ponderada con DEFAULT_WEIGHTS: la misma fórmula con la que la API recalcula
+        # una categoría cuando el usuario cambia sus sub-pesos. Sin pesos, la categoría es 0
+        coords_globales[cat] = round(suma / suma_pesos, 4) if suma_pesos else 0.0
+
+    # --- GEOMETRÍA ---
+    geo = geos.get(nombre)
+    if not geo and indice is not None:
+        m = indice.buscar(nombre, cutoff=0.6)
+        if m: geo = geos[m]
+    encontrada = bool(geo)
+
+    # El centroide de la geometría es el punto que usan los filtros por zona (bbox, radio)
+    centro = centroide_geometria(geo)
+    if centro:
+        lat, lon = centro
+    else:
+        h = sum(ord(c) for c in nombre)
+        lat = 34.0522 + (h % 100 - 50) * 0.001
+        lon = -118.2437 + (h % 100 - 50) * 0.001
+        if not geo:
+            geo = {"type": "Polygon", "coordinates": generate_hexagon(lat, lon)}
+
+    # --- DOCUMENTO FINAL ---
+    doc = {
+        "_id": bid,
+        "nombre": nombre,
+        "coords": coords_globales,  # Resultado cálculo default
+        "sub_coords": sub_coords,  # Datos crudos para recalculo API
+        "location": {"lat": lat, "lon": lon},
+        "geometry": geo
+    }
+    doc[CAMPO_HASH] = hash_documento(doc)
+    return doc, encontrada
+
+
+# --- DIFERENCIAS CON MONGO ---
+def planificar_cambios(col, docs: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Compara los hashes nuevos con los guardados (solo se lee _id y hash de cada documento)."""
+    guardados = {d["_id"]: d.get(CAMPO_HASH) for d in col.find({}, {CAMPO_HASH: 1})}
+    plan = {"nuevos": [], "modificados": [], "iguales": [], "obsoletos": []}
+    for doc in docs:
+        bid = doc["_id"]
+        if bid not in guardados:
+            plan["nuevos"].append(bid)
+        elif guardados[bid] != doc[CAMPO_HASH]:
+            plan["modificados"].append(bid)
+        else:
+            plan["iguales"].append(bid)
+
+    nuevos_ids = {doc["_id"] for doc in docs}
+    plan["obsoletos"] = sorted(bid for bid in guardados if bid not in nuevos_ids)
+    return plan
+
+
+def aplicar_cambios(db, col_nombre: str, docs: List[Dict[str, Any]], plan: Dict[str, List[str]],
+                    tam_lote: int = TAM_LOTE, borrar_obsoletos: bool = True) -> int:
+    """
+    Upsert por lotes solo de lo nuevo o modificado, y borrado de los obsoletos al final.
+    La colección nunca se vacía: la API sigue sirviendo su snapshot y solo recarga cuando
+    se incrementa la versión meta, después de escribir todo.
+    """
+    col = db[col_nombre]
+    por_id = {doc["_id"]: doc for doc in docs}
+    ops = [ReplaceOne({"_id": bid}, por_id[bid], upsert=True) for bid in plan["nuevos"] + plan["modificados"]]
+    if borrar_obsoletos and plan["obsoletos"]:
+        for i in range(0, len(plan["obsoletos"]), tam_lote):
+            ops.append(DeleteMany({"_id": {"$in": plan["obsoletos"][i:i + tam_lote]}}))
+
+    for i in range(0, len(ops), tam_lote):
+        col.bulk_write(ops[i:i + tam_lote], ordered=False)
+
+    if ops:
+        # La API sondea esta versión para recompilar su snapshot y recargar sin reiniciar
+        db[COL_META].update_one({"_id": col_nombre}, {"$inc": {"version": 1}}, upsert=True)
+    return len(ops)
+
+
+def imprimir_informe(plan: Dict[str, List[str]], no_mapeadas: Dict[str, List[str]],
+                     sin_geometria: List[str], limite: int = 20):
+    def lista(ids):
+        extra = f" ... (+{len(ids) - limite})" if len(ids) > limite else ""
+        return ", ".join(ids[:limite]) + extra
+
+    print("--- Diferencias con Mongo ---")
+    for clave, icono in [("nuevos", "➕"), ("modificados", "✏️"), ("obsoletos", "🗑️")]:
+        print(f"{icono} {clave}: {len(plan[clave])}" + (f" -> {lista(plan[clave])}" if plan[clave] else ""))
+    print(f"= iguales: {len(plan['iguales'])}")
+
+    if no_mapeadas:
+        print("⚠️ Columnas CSV sin mapear (se ignoran):")
+        for fichero, columnas in no_mapeadas.items():
+            print(f"   - {fichero}: {', '.join(columnas)}")
+    if sin_geometria:
+        print(f"⚠️ {len(sin_geometria)} barrios sin geometría (se usa un hexágono): {lista(sin_geometria)}")
+
+
+# --- PROCESO PRINCIPAL ---
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Carga incremental de los CSVs de barrios en MongoDB.")
+    parser.add_argument("--mongo-uri", default=MONGO_URI)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--coleccion", default=COL_BARRIOS)
+    parser.add_argument("--datos", default=BASE_DIR, help="Carpeta con los CSVs")
+    parser.add_argument("--geojson", default=GEOJSON_FILE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Procesos para leer los CSVs (1 = secuencial)")
+    parser.add_argument("--lote", type=int, default=TAM_LOTE, help="Operaciones por bulk_write")
+    parser.add_argument("--dry-run", action="store_true", help="Solo muestra las diferencias, no escribe")
+    parser.add_argument("--conservar-obsoletos", action="store_true",
+                        help="No borra los barrios que ya no aparecen en los CSVs")
+    args = parser.parse_args(argv)
+
+    print("--- Iniciando Carga ---")
+
+    datos, no_mapeadas, geos, geo_names = cargar_datos_completos(args.datos, args.workers, args.geojson)
+
+    if not datos:
+        print("❌ ERROR: No se han cargado barrios. Revisa los nombres de los CSV.")
+        return 1
+
+    indice = IndiceNombres(geo_names) if geo_names else None
+    barrios_finales, sin_geometria = [], []
+    for bid, data in datos.items():
+        doc, encontrada = construir_documento(bid, data, geos, indice)
+        barrios_finales.append(doc)
+        if not encontrada:
+            sin_geometria.append(data["nombre"])
+
+    client = MongoClient(args.mongo_uri)
+    db = client[args.db]
+
+    plan = planificar_cambios(db[args.coleccion], barrios_finales)
+    imprimir_informe(plan, no_mapeadas, sin_geometria)
+
+    if args.dry_run:
+        print("ℹ️ Dry-run: no se ha escrito nada.")
+        return 0
+
+    n_ops = aplicar_cambios(db, args.coleccion, barrios_finales, plan, args.lote,
+                            borrar_obsoletos=not args.conservar_obsoletos)
+    if n_ops:
+        print(f"✅ Guardados {len(plan['nuevos']) + len(plan['modificados'])} barrios "
+              f"({len(plan['iguales'])} sin cambios).")
+        print("   - Se han calculado los índices globales usando los pesos por defecto.")
+        print("   - Se han guardado las sub-variables para uso dinámico.")
+    else:
+        print("✅ Sin cambios: la colección ya estaba al día.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,467 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Backend.motor_scores import MotorScores, top_k_indices_lote
+from Backend.pesos import DEFAULT_WEIGHTS
+from Backend.snapshot import SNAPSHOT_DIR, GestorDataset, cargar_snapshot, snapshot_publicado
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional: sin pyarrow solo se puede escribir CSV
+    pa = pq = None
+
+# --- CONFIGURACIÓN ---
+# Mismas variables y Mongo que la API: si hay que compilar el snapshot, sirve también para ella
+VARIABLES = ["salut", "transporte", "precio", "ocio", "seguridad", "densidad_poblacion"]
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME = "joc_de_barris"
+COL_BARRIOS = "barrios"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERTURBACIONES_FILE = os.path.join(BASE_DIR, "log_user_modificaciones.csv")
+SALIDA = os.path.join(BASE_DIR, "resultados_simulacion")
+
+# Tope de (perfiles x barrios) por tarea: acota la memoria de cada worker (scores, órdenes y posiciones)
+ELEMENTOS_TAREA = 1_000_000
+# Escenarios por tarea: el resultado de una tarea no crece con la rejilla (cada tarea recalcula base como referencia)
+ESCENARIOS_TAREA = 16
+# Tareas pendientes por worker: los resultados se escriben según llegan y la memoria no crece con la rejilla
+TAREAS_POR_WORKER = 2
+# Escenarios que se listan en el resumen final (los menos estables primero)
+MAX_RESUMEN = 20
+
+# (nombre, sub_pesos) con la forma que acepta MotorScores.con_sub_pesos; el primero es siempre "base"
+Escenario = Tuple[str, Dict[str, Dict[str, float]]]
+
+
+# === PERFILES ===
+def cargar_perfiles(ruta: str, variables: Sequence[str]) -> Tuple[List[str], List[str], np.ndarray, List[str]]:
+    """
+    Lee perfiles de un CSV (columna id, nombre opcional y una columna por variable) o de un JSON con
+    la forma de CLIENTES en recomendador.py ({id: {"nombre": ..., "prefs": {...}}}).
+    Devuelve (ids, nombres, matriz perfiles x variables con NaN donde no hay valor, variables desconocidas).
+    """
+    filas = []
+    if ruta.endswith(".json"):
+        with open(ruta, "r", encoding="utf-8") as f:
+            for pid, perfil in json.load(f).items():
+                filas.append((pid, perfil.get("nombre", pid), perfil.get("prefs", {})))
+    else:
+        with open(ruta, newline="", encoding="utf-8") as f:
+            for i, fila in enumerate(csv.DictReader(f)):
+                pid = fila.pop("id", None) or str(i)
+                nombre = fila.pop("nombre", None) or pid
+                filas.append((pid, nombre, {k: v for k, v in fila.items() if v not in (None, "")}))
+
+    desconocidas = sorted({var for _, _, prefs in filas for var in prefs} - set(variables))
+    matriz = np.full((len(filas), len(variables)), np.nan, dtype=np.float32)
+    for i, (_, _, prefs) in enumerate(filas):
+        for j, var in enumerate(variables):
+            if var in prefs:
+                matriz[i, j] = float(prefs[var])
+
+    return [f[0] for f in filas], [f[1] for f in filas], matriz, desconocidas
+
+
+def perfiles_aleatorios(n: int, variables: Sequence[str], modo: str,
+                        semilla: int = 0) -> Tuple[List[str], List[str], np.ndarray]:
+    """Perfiles uniformes en [0, 1]; en modo objetivo ~30% de las variables quedan como indiferentes."""
+    rng = np.random.default_rng(semilla)
+    matriz = np.round(rng.random((n, len(variables))), 2).astype(np.float32)
+    if modo == "objetivo":
+        matriz[rng.random(matriz.shape) < 0.3] = np.nan
+    ids = [f"aleatorio_{i:06d}" for i in range(n)]
+    return ids, ids, matriz
+
+
+def perfiles_validos(matriz: np.ndarray, modo: str) -> np.ndarray:
+    """Máscara de perfiles que puntúan algo: alguna variable activa (objetivo) o algún peso no nulo (pesos)."""
+    if modo == "objetivo":
+        return (np.nan_to_num(matriz, nan=-1.0) >= 0.0).any(axis=1)
+    return (np.nan_to_num(matriz, nan=0.0) != 0.0).any(axis=1)
+
+
+# === ESCENARIOS ===
+def cargar_perturbaciones(ruta: str, sub_variables: Dict[str, Dict[str, float]]) -> List[Escenario]:
+    """
+    Lee un CSV como log_user_modificaciones.csv (Subvariable, Base, Nuevo_Peso, Diferencia).
+    Cada fila es un escenario; si hay columna Escenario, las filas que la comparten se aplican juntas.
+    """
+    categorias = {sub: cat for cat, subs in sub_variables.items() for sub in subs}
+    escenarios: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    with open(ruta, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            sub = fila["Subvariable"].strip()
+            if sub not in categorias:
+                print(f"⚠️ Sub-variable desconocida en {os.path.basename(ruta)}: {sub} (se ignora)")
+                continue
+            peso = float(fila["Nuevo_Peso"])
+            nombre = (fila.get("Escenario") or "").strip() or f"{sub}={peso:g}"
+            escenarios.setdefault(nombre, {}).setdefault(categorias[sub], {})[sub] = peso
+
+    return list(escenarios.items())
+
+
+def rejilla_perturbaciones(sub_variables: Dict[str, Dict[str, float]], deltas: Sequence[float]) -> List[Escenario]:
+    """Un escenario por sub-variable y delta: su peso por defecto + delta (sin bajar de 0)."""
+    return [
+        (f"{sub}{delta:+g}", {cat: {sub: round(max(0.0, peso + delta), 4)}})
+        for cat, subs in sub_variables.items()
+        for sub, peso in subs.items()
+        for delta in deltas
+    ]
+
+
+# === CÁLCULO (WORKERS) ===
+# Estado de cada proceso: el motor se mapea del snapshot una vez y las páginas se comparten vía el SO
+_ESTADO: Dict[str, Any] = {}
+
+
+def _iniciar_worker(ruta: str, modo: str, escenarios: List[Escenario], top_k: int):
+    _ESTADO.update(motor=cargar_snapshot(ruta).motor, modo=modo, escenarios=escenarios, top_k=top_k)
+
+
+def puntuar(motor: MotorScores, modo: str, perfiles: np.ndarray) -> np.ndarray:
+    """Matriz (perfiles x barrios) con el mismo cálculo que la API del modo elegido."""
+    lista = [{v: float(x) for v, x in zip(motor.variables, fila) if not np.isnan(x)} for fila in perfiles]
+    if modo == "objetivo":
+        return motor.puntuar_objetivo_lote(lista)[0]
+    return motor.puntuar_pesos_lote(lista)
+
+
+def contribuciones(motor: MotorScores, modo: str, perfiles: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """
+    (perfiles x top_k x variables): lo que aporta cada variable al score de cada ganador (suman el score).
+    Es el desglose de explicar_recomendacion en recomendador.py, para todo el lote a la vez.
+    """
+    if modo == "objetivo":
+        objetivo = np.nan_to_num(perfiles, nan=-1.0)
+        activas = objetivo >= 0.0
+        similitud = 1.0 - np.abs(motor.matriz(0.5)[indices] - objetivo[:, None, :])
+        return np.where(activas[:, None, :], similitud, 0.0) / np.maximum(activas.sum(axis=1), 1)[:, None, None]
+
+    return motor.matriz(0.0)[indices] * np.nan_to_num(perfiles, nan=0.0)[:, None, :]
+
+
+def posiciones(scores: np.ndarray) -> np.ndarray:
+    """
+    Posición (0 = mejor) de cada barrio en cada fila. Empates por orden de barrio, como top_k_indices.
+    En vez de un argsort estable (lo más caro de la simulación) se ordenan claves uint64 de
+    (score descendente, índice del barrio), que son únicas y el sort por defecto de NumPy ordena ~4x más rápido.
+    """
+    bits = (scores + np.float32(0.0)).astype(np.float32).view(np.uint32)  # + 0.0: -0.0 pasa a 0.0
+    ascendente = np.where(bits >> np.uint32(31), ~bits, bits | np.uint32(0x80000000))
+    claves = (~ascendente).astype(np.uint64) << np.uint64(32) | np.arange(scores.shape[1], dtype=np.uint64)
+    orden = (np.sort(claves, axis=1) & np.uint64(0xFFFFFFFF)).astype(np.intp)
+    pos = np.empty(orden.shape, dtype=np.int32)
+    np.put_along_axis(pos, orden, np.broadcast_to(np.arange(scores.shape[1], dtype=np.int32), orden.shape), axis=1)
+    return pos
+
+
+def metricas_estabilidad(base: Dict[str, np.ndarray], scores: np.ndarray, top: np.ndarray) -> Dict[str, np.ndarray]:
+    """Compara el ranking de un escenario con el de base, perfil a perfil."""
+    pos = posiciones(scores)
+    n = scores.shape[1]
+    filas = np.arange(len(scores))
+    top1_base = base["top"][:, 0]
+
+    # Spearman sobre el orden completo: ambos son permutaciones de 0..n-1
+    d = pos.astype(np.int64) - base["pos"]
+    d2 = np.einsum("ij,ij->i", d, d).astype(np.float64)
+    spearman = 1.0 - 6.0 * d2 / (n * (n * n - 1.0)) if n > 1 else np.ones(len(scores))
+
+    return {
+        "top1_base": top1_base,
+        "top1_igual": top[:, 0] == top1_base,
+        "solape_top_k": (base["top"][:, :, None] == top[:, None, :]).any(axis=2).mean(axis=1),
+        "spearman": spearman,
+        "posicion_top1_base": pos[filas, top1_base] + 1,
+        "delta_score_top1_base": scores[filas, top1_base] - base["scores"][filas, top1_base],
+    }
+
+
+def simular_bloque(inicio: int, perfiles: np.ndarray, primero: int,
+                   ultimo: int) -> Tuple[int, int, List[Dict[str, np.ndarray]]]:
+    """
+    Puntúa un bloque de perfiles en los escenarios [primero, ultimo). Por escenario devuelve los top_k
+    (índices, scores y contribuciones) y, salvo en base, las métricas de estabilidad frente a base.
+    Base se puntúa siempre como referencia, pero solo se devuelve en la tarea que lo incluye.
+    """
+    motor, modo, top_k, escenarios = _ESTADO["motor"], _ESTADO["modo"], _ESTADO["top_k"], _ESTADO["escenarios"]
+    base = None
+    resultados = []
+
+    for s in ([0] if primero else []) + list(range(primero, ultimo)):
+        # Vistas cacheadas por sub-pesos: cada worker las calcula una vez para todos sus bloques
+        vista = motor.con_sub_pesos(escenarios[s][1])
+        scores = puntuar(vista, modo, perfiles)
+        top = top_k_indices_lote(scores, top_k)
+        if base is None:
+            base = {"scores": scores, "top": top, "pos": posiciones(scores)}
+            if primero:  # solo referencia: base ya lo escribe la tarea de los primeros escenarios
+                continue
+        resultado = {
+            "top": top,
+            "scores": np.take_along_axis(scores, top, axis=1),
+            "contribuciones": contribuciones(vista, modo, perfiles, top),
+        }
+        if s:
+            resultado.update(metricas_estabilidad(base, scores, top))
+        resultados.append(resultado)
+
+    return inicio, primero, resultados
+
+
+def _en_orden(pool: ProcessPoolExecutor, tareas: Iterable[Tuple[int, np.ndarray, int, int]],
+              pendientes: int) -> Iterator:
+    """Resultados en el orden de las tareas, con como mucho `pendientes` enviadas a la vez."""
+    cola = deque()
+    for tarea in tareas:
+        cola.append(pool.submit(simular_bloque, *tarea))
+        if len(cola) >= pendientes:
+            yield cola.popleft().result()
+    while cola:
+        yield cola.popleft().result()
+
+
+# === SALIDA ===
+class EscritorTabla:
+    """Escribe una tabla bloque a bloque en CSV o Parquet (con pyarrow): nunca está entera en memoria."""
+
+    def __init__(self, ruta: str, columnas: Sequence[str], formato: str = "csv"):
+        self.ruta = ruta
+        self.columnas = list(columnas)
+        self.formato = formato
+        self.filas = 0
+        self._parquet = None
+        if formato == "csv":
+            self._f = open(ruta, "w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._f)
+            self._csv.writerow(self.columnas)
+
+    def escribir(self, bloque: Dict[str, Any]):
+        if self.formato == "parquet":
+            tabla = pa.table({c: bloque[c] for c in self.columnas})
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.ruta, tabla.schema)
+            self._parquet.write_table(tabla)
+        else:
+            valores = [np.round(v.astype(np.float64), 6).tolist() if isinstance(v, np.ndarray) and v.dtype.kind == "f" else list(v)
+                       for v in (bloque[c] for c in self.columnas)]
+            self._csv.writerows(zip(*valores))
+        self.filas += len(bloque[self.columnas[0]])
+
+    def cerrar(self):
+        if self.formato == "csv":
+            self._f.close()
+        elif self._parquet is not None:
+            self._parquet.close()
+
+
+class Simulacion:
+    """
+    Reparte (bloque de perfiles, tramo de escenarios) entre los workers y va volcando cada resultado según llega:
+    - ranking: una fila por (escenario, perfil, puesto) con score y contribución de cada variable.
+    - estabilidad: una fila por (escenario, perfil) comparando con base.
+    Del resumen por escenario solo se guardan sumas, así que la memoria no depende del tamaño de la rejilla.
+    """
+
+    def __init__(self, motor: MotorScores, ids: List[str], nombres: List[str], escenarios: List[Escenario],
+                 ranking: EscritorTabla, estabilidad: EscritorTabla):
+        self.variables = motor.variables
+        self.ids_barrios = np.asarray(motor.ids, dtype=object)
+        self.nombres_barrios = np.asarray(motor.nombres, dtype=object)
+        self.ids = np.asarray(ids, dtype=object)
+        self.nombres = np.asarray(nombres, dtype=object)
+        self.escenarios = escenarios
+        self.ranking = ranking
+        self.estabilidad = estabilidad
+
+        # Sumas por escenario (el 0 es base y no se compara)
+        self.n_perfiles = 0
+        self.sumas = {m: np.zeros(len(escenarios)) for m in ("top1_igual", "solape_top_k", "spearman")}
+        self.spearman_min = np.ones(len(escenarios))
+
+    def volcar(self, inicio: int, primero: int, resultados: List[Dict[str, np.ndarray]]):
+        n = len(resultados[0]["top"])
+        ids, nombres = self.ids[inicio:inicio + n], self.nombres[inicio:inicio + n]
+        if primero == 0:  # cada bloque pasa una sola vez por el tramo que empieza en base
+            self.n_perfiles += n
+
+        for s, r in enumerate(resultados, start=primero):
+            escenario = self.escenarios[s][0]
+            k = r["top"].shape[1]
+            top = r["top"].ravel()
+            bloque = {
+                "escenario": [escenario] * (n * k),
+                "perfil_id": np.repeat(ids, k),
+                "perfil": np.repeat(nombres, k),
+                "puesto": np.tile(np.arange(1, k + 1), n),
+                "barrio_id": self.ids_barrios[top],
+                "barrio": self.nombres_barrios[top],
+                "score": r["scores"].ravel(),
+            }
+            contrib = r["contribuciones"].reshape(n * k, len(self.variables))
+            for j, var in enumerate(self.variables):
+                bloque[f"contrib_{var}"] = contrib[:, j]
+            self.ranking.escribir(bloque)
+
+            if s == 0:
+                continue
+            self.estabilidad.escribir({
+                "escenario": [escenario] * n,
+                "perfil_id": ids,
+                "perfil": nombres,
+                "top1_base": self.ids_barrios[r["top1_base"]],
+                "top1": self.ids_barrios[r["top"][:, 0]],
+                "top1_igual": r["top1_igual"],
+                "solape_top_k": r["solape_top_k"],
+                "spearman": r["spearman"],
+                "posicion_top1_base": r["posicion_top1_base"],
+                "delta_score_top1_base": r["delta_score_top1_base"],
+            })
+            for m, suma in self.sumas.items():
+                suma[s] += float(np.sum(r[m]))
+            self.spearman_min[s] = min(self.spearman_min[s], float(np.min(r["spearman"])))
+
+    def resumen(self) -> List[Tuple[str, float, float, float, float]]:
+        """(escenario, % top-1 igual, solape medio, spearman medio, spearman mínimo), menos estables primero."""
+        n = max(self.n_perfiles, 1)
+        filas = [
+            (nombre, 100.0 * self.sumas["top1_igual"][s] / n, self.sumas["solape_top_k"][s] / n,
+             self.sumas["spearman"][s] / n, self.spearman_min[s])
+            for s, (nombre, _) in enumerate(self.escenarios) if s > 0
+        ]
+        return sorted(filas, key=lambda f: (f[1], f[3]))
+
+
+COLUMNAS_ESTABILIDAD = ["escenario", "perfil_id", "perfil", "top1_base", "top1", "top1_igual", "solape_top_k",
+                        "spearman", "posicion_top1_base", "delta_score_top1_base"]
+
+
+def simular(ruta: str, motor: MotorScores, ids: List[str], nombres: List[str], perfiles: np.ndarray,
+            escenarios: List[Escenario], modo: str, top_k: int, workers: int, salida: str,
+            formato: str = "csv") -> Simulacion:
+    """Ejecuta la simulación completa y devuelve el objeto con el resumen (los ficheros ya cerrados)."""
+    columnas_ranking = ["escenario", "perfil_id", "perfil", "puesto", "barrio_id", "barrio", "score"]
+    columnas_ranking += [f"contrib_{var}" for var in motor.variables]
+    ranking = EscritorTabla(f"{salida}_ranking.{formato}", columnas_ranking, formato)
+    estabilidad = EscritorTabla(f"{salida}_estabilidad.{formato}", COLUMNAS_ESTABILIDAD, formato)
+    sim = Simulacion(motor, ids, nombres, escenarios, ranking, estabilidad)
+
+    bloque = max(1, ELEMENTOS_TAREA // max(1, len(motor)))
+    # Por bloque, todos sus tramos seguidos: la salida queda en el mismo orden (bloque, escenario)
+    tareas = ((ini, perfiles[ini:ini + bloque], primero, min(primero + ESCENARIOS_TAREA, len(escenarios)))
+              for ini in range(0, len(perfiles), bloque)
+              for primero in range(0, len(escenarios), ESCENARIOS_TAREA))
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                                     initargs=(ruta, modo, escenarios, top_k)) as pool:
+                for resultado in _en_orden(pool, tareas, workers * TAREAS_POR_WORKER):
+                    sim.volcar(*resultado)
+        else:
+            _iniciar_worker(ruta, modo, escenarios, top_k)
+            for tarea in tareas:
+                sim.volcar(*simular_bloque(*tarea))
+    finally:
+        ranking.cerrar()
+        estabilidad.cerrar()
+    return sim
+
+
+# --- PROCESO PRINCIPAL ---
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulación por lotes y análisis de sensibilidad de los rankings.")
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--perfiles", help="CSV (id, nombre y una columna por variable) o JSON como CLIENTES")
+    origen.add_argument("--aleatorios", type=int, help="Genera N perfiles aleatorios en lugar de leerlos")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla de --aleatorios")
+    parser.add_argument("--perturbaciones", default=PERTURBACIONES_FILE,
+                        help="CSV de cambios de sub-pesos (como log_user_modificaciones.csv); '' para ninguno")
+    parser.add_argument("--deltas", type=float, nargs="*", default=[],
+                        help="Rejilla: un escenario por sub-variable y delta sobre su peso por defecto")
+    parser.add_argument("--modo", choices=["pesos", "objetivo"], default="pesos",
+                        help="pesos = producto punto (recomendador.py, barrios_store.py); objetivo = api.py")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos (1 = secuencial)")
+    parser.add_argument("--salida", default=SALIDA, help="Prefijo de los ficheros _ranking y _estabilidad")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--mongo-uri", default=MONGO_URI, help="Solo si no hay snapshot publicado")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--coleccion", default=COL_BARRIOS)
+    args = parser.parse_args(argv)
+
+    if args.top_k < 1:
+        parser.error("--top-k tiene que ser al menos 1")
+    if args.formato == "parquet" and pq is None:
+        print("❌ ERROR: --formato parquet necesita pyarrow (pip install pyarrow).")
+        return 1
+
+    print("--- Iniciando Simulación ---")
+    ruta = snapshot_publicado(args.snapshot_dir)
+    if ruta is None:
+        print("ℹ️ No hay snapshot publicado: se compila desde Mongo.")
+        ruta = GestorDataset(VARIABLES, DEFAULT_WEIGHTS, args.mongo_uri, args.db, args.coleccion,
+                             args.snapshot_dir).actual.ruta
+    motor = cargar_snapshot(ruta).motor
+
+    if args.perfiles:
+        ids, nombres, perfiles, desconocidas = cargar_perfiles(args.perfiles, motor.variables)
+        if desconocidas:
+            print(f"⚠️ Variables de los perfiles que no están en el dataset (se ignoran): {', '.join(desconocidas)}")
+    else:
+        ids, nombres, perfiles = perfiles_aleatorios(args.aleatorios, motor.variables, args.modo, args.semilla)
+
+    validos = perfiles_validos(perfiles, args.modo)
+    if not validos.all():
+        print(f"⚠️ {int((~validos).sum())} perfiles sin ninguna variable que puntúe (se ignoran)")
+        ids = [pid for pid, ok in zip(ids, validos) if ok]
+        nombres = [nombre for nombre, ok in zip(nombres, validos) if ok]
+        perfiles = perfiles[validos]
+    if not len(perfiles):
+        print("❌ ERROR: No hay perfiles que simular.")
+        return 1
+
+    escenarios: List[Escenario] = [("base", {})]
+    if args.perturbaciones:
+        if os.path.exists(args.perturbaciones):
+            escenarios += cargar_perturbaciones(args.perturbaciones, motor.sub_variables)
+        else:
+            print(f"⚠️ Falta archivo: {args.perturbaciones} (sin perturbaciones de fichero)")
+    escenarios += rejilla_perturbaciones(motor.sub_variables, args.deltas)
+
+    print(f"📦 {len(motor)} barrios | {len(perfiles)} perfiles | {len(escenarios) - 1} escenarios + base "
+          f"| modo {args.modo} | {args.workers} workers")
+    t0 = time.perf_counter()
+    sim = simular(ruta, motor, ids, nombres, perfiles, escenarios, args.modo, args.top_k, args.workers,
+                  args.salida, args.formato)
+    print(f"✅ Simulación terminada en {time.perf_counter() - t0:.1f} s")
+    print(f"   - {sim.ranking.ruta} ({sim.ranking.filas} filas)")
+    print(f"   - {sim.estabilidad.ruta} ({sim.estabilidad.filas} filas)")
+
+    filas = sim.resumen()
+    if filas:
+        print(f"--- Estabilidad frente a base (media sobre {sim.n_perfiles} perfiles, menos estables primero) ---")
+        for nombre, top1, solape, spearman, spearman_min in filas[:MAX_RESUMEN]:
+            print(f"{nombre:<28} top-1 igual {top1:5.1f}% | solape top-{args.top_k} {solape:.3f} "
+                  f"| spearman {spearman:.4f} (mín {spearman_min:.4f})")
+        if len(filas) > MAX_RESUMEN:
+            print(f"... y {len(filas) - MAX_RESUMEN} escenarios más en {sim.estabilidad.ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+from pymongo import MongoClient
+
+from Backend.espacial import IndiceEspacial, calcular_bboxes, centroides_de
+from Backend.geometrias import AlmacenGeometrias
+from Backend.motor_scores import MotorScores
+
+# Directorio con los snapshots compilados (uno por versión) y el puntero ACTUAL a la vigente
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots"))
+# Cada cuántos segundos se comprueba si hay datos nuevos (0 = sin recarga en segundo plano)
+RECARGA_INTERVALO = float(os.getenv("RECARGA_INTERVALO", "30"))
+
+COL_META = "meta"
+FORMATO_SNAPSHOT = 2
+SNAPSHOTS_CONSERVADOS = 3
+
+# Valores de relleno de coords que faltan: 0.5 (target matching) y 0.0 (producto punto)
+VALORES_RELLENO = (0.5, 0.0)
+
+
+# === LECTURA DE MONGO ===
+def leer_documentos_mongo(col_barrios) -> List[Dict[str, Any]]:
+    docs = []
+    for doc in col_barrios.find({}):
+        if "coords" in doc and "crimen" in doc["coords"]:
+            doc["coords"]["seguridad"] = doc["coords"].pop("crimen")
+        docs.append(doc)
+    return docs
+
+
+def version_mongo(db, col_nombre: str) -> Optional[int]:
+    """Versión que el seed incrementa en la colección meta tras cada carga."""
+    meta = db[COL_META].find_one({"_id": col_nombre})
+    return meta.get("version") if meta else None
+
+
+# === GEOMETRÍAS POR BARRIO (MAPEADAS) ===
+class GeometriasMapeadas:
+    """
+    Geometría de cada barrio como blob JSON dentro de un único fichero mapeado en memoria.
+    Solo se parsean las de los ganadores que la piden (incluir_geometria=True).
+    """
+
+    def __init__(self, ruta_blobs: str, offsets: np.ndarray):
+        self.offsets = offsets
+        with open(ruta_blobs, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(ruta_blobs) else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> Optional[Dict[str, Any]]:
+        ini, fin = int(self.offsets[i]), int(self.offsets[i + 1])
+        return json.loads(self._mm[ini:fin]) if fin > ini else None
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+# === SNAPSHOT ===
+def hash_contenido(docs: List[Dict[str, Any]], *extra: Any) -> str:
+    h = hashlib.sha1(json.dumps(extra, sort_keys=True, default=str).encode("utf-8"))
+    for doc in sorted(docs, key=lambda d: d["_id"]):
+        h.update(json.dumps(doc, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def compilar_snapshot(docs: List[Dict[str, Any]], variables: Sequence[str], sub_variables: Dict[str, Dict[str, float]],
+                      directorio_base: str = SNAPSHOT_DIR, version_origen: Optional[int] = None) -> str:
+    """
+    Compila los documentos en un directorio versionado (hash del formato, el contenido, las variables
+    y la versión de Mongo de la que salen) con:
+    matrices .npy (coords, rellenas, tensor de sub_coords y cajas de los polígonos), ids/nombres/locations,
+    blobs de geometría por barrio y las FeatureCollection pre-serializadas por nivel.
+    Se escribe en un directorio temporal y se renombra al final: nunca queda a medias.
+    """
+    version = hash_contenido(docs, FORMATO_SNAPSHOT, list(variables), sub_variables, version_origen)
+    destino = os.path.join(directorio_base, version)
+    if os.path.exists(os.path.join(destino, "manifest.json")):
+        return destino
+
+    os.makedirs(directorio_base, exist_ok=True)
+    tmp = os.path.join(directorio_base, f".tmp-{version}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(tmp)
+
+    try:
+        motor = MotorScores.desde_documentos(docs, variables, sub_variables)
+        np.save(os.path.join(tmp, "coords.npy"), motor.coords)
+        for valor in VALORES_RELLENO:
+            np.save(os.path.join(tmp, f"rellena_{valor}.npy"), motor.matriz(valor))
+        np.save(os.path.join(tmp, "sub_tensor.npy"), motor.sub_tensor)
+
+        offsets = [0]
+        with open(os.path.join(tmp, "geometrias.bin"), "wb") as f:
+            for geo in motor.geometrias:
+                blob = json.dumps(geo, separators=(",", ":")).encode("utf-8") if geo else b""
+                f.write(blob)
+                offsets.append(offsets[-1] + len(blob))
+        np.save(os.path.join(tmp, "geometrias_offsets.npy"), np.array(offsets, dtype=np.int64))
+        np.save(os.path.join(tmp, "bboxes.npy"), calcular_bboxes(motor.locations, motor.geometrias))
+
+        etags = AlmacenGeometrias.escribir(tmp, motor.ids, motor.nombres, motor.geometrias)
+
+        with open(os.path.join(tmp, "barrios.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": motor.ids, "nombres": motor.nombres, "locations": motor.locations}, f)
+
+        # El manifest va el último: su presencia marca el snapshot como completo
+        with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "formato": FORMATO_SNAPSHOT,
+                "version": version,
+                "version_mongo": version_origen,
+                "creado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "n_barrios": len(motor),
+                "variables": list(variables),
+                "sub_variables": sub_variables,
+                "etags": etags,
+            }, f)
+
+        os.rename(tmp, destino)
+    except OSError:
+        # Otro worker ha compilado la misma versión a la vez: nos quedamos con la suya
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(os.path.join(destino, "manifest.json")):
+            raise
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    return destino
+
+
+def publicar_snapshot(ruta: str, directorio_base: str = SNAPSHOT_DIR):
+    """Apunta ACTUAL a este snapshot (escritura atómica con os.replace)."""
+    tmp = os.path.join(directorio_base, f".ACTUAL-{uuid.uuid4().hex[:8]}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(ruta))
+    os.replace(tmp, os.path.join(directorio_base, "ACTUAL"))
+
+
+def limpiar_snapshots(directorio_base: str = SNAPSHOT_DIR, conservar: int = SNAPSHOTS_CONSERVADOS):
+    """
+    Borra los snapshots más antiguos. Los workers que aún tengan uno cargado no se ven afectados:
+    cargar_snapshot lee o mapea todos sus ficheros (también las geometrías por nivel) y en Linux
+    las páginas siguen siendo válidas hasta que se cierra el mapeo.
+    """
+    actual = snapshot_publicado(directorio_base)
+    rutas = [os.path.join(directorio_base, d) for d in os.listdir(directorio_base)]
+    rutas = [r for r in rutas if os.path.exists(os.path.join(r, "manifest.json")) and r != actual]
+    rutas.sort(key=os.path.getmtime, reverse=True)
+    for ruta in rutas[max(0, conservar - 1):]:
+        shutil.rmtree(ruta, ignore_errors=True)
+
+
+def snapshot_publicado(directorio_base: str = SNAPSHOT_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(directorio_base, "ACTUAL"), "r", encoding="utf-8") as f:
+            ruta = os.path.join(directorio_base, f.read().strip())
+    except FileNotFoundError:
+        return None
+    return ruta if os.path.exists(os.path.join(ruta, "manifest.json")) else None
+
+
+def leer_manifest(ruta: str) -> Dict[str, Any]:
+    with open(os.path.join(ruta, "manifest.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# === DATASET ===
+class Dataset:
+    """Todo lo que necesita una petición, cargado de un snapshot. Se sustituye entero al recargar."""
+
+    def __init__(self, ruta: str, manifest: Dict[str, Any], motor: MotorScores, geometrias: AlmacenGeometrias,
+                 espacial: IndiceEspacial):
+        self.ruta = ruta
+        self.manifest = manifest
+        self.version = manifest["version"]
+        self.motor = motor
+        self.geometrias = geometrias
+        self.espacial = espacial
+
+
+def cargar_snapshot(ruta: str) -> Dataset:
+    """Mapea las matrices en memoria (mmap_mode='r'): los workers comparten las páginas vía el SO."""
+    manifest = leer_manifest(ruta)
+    with open(os.path.join(ruta, "barrios.json"), "r", encoding="utf-8") as f:
+        barrios = json.load(f)
+
+    motor = MotorScores(
+        manifest["variables"],
+        ids=barrios["ids"],
+        nombres=barrios["nombres"],
+        coords=np.load(os.path.join(ruta, "coords.npy"), mmap_mode="r"),
+        locations=barrios["locations"],
+        geometrias=GeometriasMapeadas(os.path.join(ruta, "geometrias.bin"),
+                                      np.load(os.path.join(ruta, "geometrias_offsets.npy"), mmap_mode="r")),
+        sub_variables=manifest["sub_variables"],
+        sub_tensor=np.load(os.path.join(ruta, "sub_tensor.npy"), mmap_mode="r"),
+        rellenas={valor: np.load(os.path.join(ruta, f"rellena_{valor}.npy"), mmap_mode="r")
+                  for valor in VALORES_RELLENO},
+    )
+    # La rejilla espacial se construye al cargar (vectorizado, milisegundos) a partir de las cajas guardadas
+    espacial = IndiceEspacial(centroides_de(motor.locations), np.load(os.path.join(ruta, "bboxes.npy")))
+    return Dataset(ruta, manifest, motor, AlmacenGeometrias.desde_directorio(ruta, manifest["etags"]), espacial)
+
+
+class GestorDataset:
+    """
+    Dataset activo de un worker y su recarga en caliente.
+
+    - Al arrancar mapea el snapshot publicado en ACTUAL sin tocar Mongo; si no hay (o no encaja con
+      las variables de la API) lee Mongo una vez, compila el snapshot y lo publica.
+    - Recarga: un hilo en segundo plano comprueba cada RECARGA_INTERVALO segundos si ACTUAL apunta a
+      otro snapshot (lo ha publicado otro worker o el seed) o si la versión de Mongo ha cambiado.
+      También se puede forzar con recargar_desde_mongo() (endpoint de admin).
+    - El cambio es una sola asignación de `actual`: las peticiones en curso terminan con el dataset
+      que cogieron al empezar.
+    """
+
+    def __init__(self, variables: Sequence[str], sub_variables: Dict[str, Dict[str, float]],
+                 mongo_uri: str, db_name: str, col_barrios: str, directorio: str = SNAPSHOT_DIR):
+        self.variables = list(variables)
+        self.sub_variables = sub_variables
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.col_barrios = col_barrios
+        self.directorio = directorio
+        self._mongo: Optional[MongoClient] = None
+        self._lock_recarga = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+
+        ruta = snapshot_publicado(directorio)
+        if ruta and self._compatible(leer_manifest(ruta)):
+            self.actual = cargar_snapshot(ruta)
+            print(f"📦 Snapshot {self.actual.version} mapeado ({self.actual.manifest['n_barrios']} barrios)")
+        else:
+            self.actual = None
+            self.recargar_desde_mongo()
+
+    def _compatible(self, manifest: Dict[str, Any]) -> bool:
+        return (manifest.get("formato") == FORMATO_SNAPSHOT and manifest["variables"] == self.variables
+                and manifest["sub_variables"] == self.sub_variables)
+
+    def _db(self):
+        if self._mongo is None:
+            self._mongo = MongoClient(self.mongo_uri)
+        return self._mongo[self.db_name]
+
+    def recargar_desde_mongo(self) -> Dataset:
+        with self._lock_recarga:
+            db = self._db()
+            version_origen = version_mongo(db, self.col_barrios)
+            docs = leer_documentos_mongo(db[self.col_barrios])
+
+            ruta = compilar_snapshot(docs, self.variables, self.sub_variables, self.directorio, version_origen)
+            publicar_snapshot(ruta, self.directorio)
+            limpiar_snapshots(self.directorio)
+            self._activar(ruta)
+            print(f"🔄 Dataset {self.actual.version} compilado desde Mongo ({len(docs)} barrios)")
+            return self.actual
+
+    def _activar(self, ruta: str):
+        if self.actual is None or self.actual.ruta != ruta:
+            self.actual = cargar_snapshot(ruta)
+
+    def comprobar_cambios(self):
+        ruta = snapshot_publicado(self.directorio)
+        if ruta and ruta != self.actual.ruta and self._compatible(leer_manifest(ruta)):
+            with self._lock_recarga:
+                self._activar(ruta)
+            print(f"🔄 Dataset {self.actual.version} publicado por otro proceso")
+            return
+
+        version = version_mongo(self._db(), self.col_barrios)
+        if version is not None and version != self.actual.manifest.get("version_mongo"):
+            self.recargar_desde_mongo()
+
+    def iniciar_vigilancia(self, intervalo: float = RECARGA_INTERVALO):
+        if intervalo <= 0 or self._hilo is not None:
+            return
+
+        def bucle():
+            while True:
+                time.sleep(intervalo)
+                try:
+                    self.comprobar_cambios()
+                except Exception as e:
+                    print(f"❌ Error comprobando recarga de datos: {e}")
+
+        self._hilo = threading.Thread(target=bucle, name="recarga-dataset", daemon=True)
+        self._hilo.start()
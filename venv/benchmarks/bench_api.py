@@ -0,0 +1,250 @@
+"""
+Benchmark del recomendador de punta a punta, con datasets sintéticos de 100 a 100k barrios.
+
+Mide p50/p99 y throughput de:
+  - la puntuación (MotorScores): objetivo, pesos, lote, sub-pesos y filtro espacial
+  - los endpoints /api/recomendar_* de api.py y barrios_store.py (con el desglose por etapa de la
+    cabecera Server-Timing)
+  - el seed: carga inicial, recarga sin cambios y recarga con un 1% de barrios modificados
+
+Todo corre en un proceso: MongoDB se sustituye por una colección en memoria y el LLM por un
+servidor HTTP local que contesta con la misma forma que la API real.
+
+Uso (desde la carpeta que contiene Backend/):
+    python -m benchmarks.bench_api
+    python -m benchmarks.bench_api --tamanos 100 1000 --peticiones 100 --retardo-llm 0.05
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+VARIABLES = ["salut", "transporte", "precio", "ocio", "seguridad", "densidad_poblacion"]
+
+TEXTOS = [
+    "Quiero un barrio barato y seguro con parques",
+    "Busco zona de fiesta con bares y metro",
+    "Tranquilo, sin ruido, con naturaleza y buen aire",
+    "Algo de lujo, exclusivo y con vigilancia",
+    "Cerca del centro, con tiendas y transporte",
+    "Odio la fiesta, quiero silencio y zonas verdes",
+    "Barato aunque sea con un poco de crimen",
+    "Para familias: colegios, parques y poca gente",
+]
+
+
+def preparar_entorno(directorio: str, retardo_llm: float):
+    """Variables de entorno y sustitutos que la API lee al importarse."""
+    from benchmarks.sintetico import LLMFalso, MongoMemoria
+
+    llm = LLMFalso(VARIABLES, retardo_llm)
+    os.environ["SNAPSHOT_DIR"] = os.path.join(directorio, "snapshots")
+    os.environ["RECARGA_INTERVALO"] = "0"
+    os.environ["LLM_API_KEY"] = "bench"
+    os.environ["LLM_ENDPOINT"] = llm.endpoint
+
+    from Backend import seed_barrios, snapshot
+    mongo = MongoMemoria()
+    snapshot.MongoClient = lambda *a, **k: mongo
+    seed_barrios.MongoClient = lambda *a, **k: mongo
+    return mongo, llm
+
+
+def cargar_dataset(mongo, apps, docs):
+    """Sustituye la colección, compila el snapshot en la primera app y las demás lo recogen."""
+    col = mongo["joc_de_barris"]["barrios"]
+    col.delete_many({})
+    col.insert_many(docs)
+    mongo["joc_de_barris"]["meta"].update_one({"_id": "barrios"}, {"$inc": {"version": 1}}, upsert=True)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        apps[0].datos.recargar_desde_mongo()
+        compilar = time.perf_counter() - t0
+        for app in apps[1:]:
+            app.datos.comprobar_cambios()
+    return compilar
+
+
+def medir(fn, repeticiones: int):
+    fn()
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t0)
+    return tiempos
+
+
+def imprimir(nombre: str, tiempos, total=None, extra: str = ""):
+    from benchmarks.sintetico import percentiles
+    p50, p99, ops = percentiles(tiempos, total)
+    print(f"  {nombre:<34} p50 {p50:9.3f} ms | p99 {p99:9.3f} ms | {ops:10.0f} ops/s {extra}")
+
+
+# === PUNTUACIÓN ===
+def bench_puntuacion(docs, repeticiones: int):
+    from Backend.espacial import IndiceEspacial, calcular_bboxes, centroides_de
+    from Backend.motor_scores import MotorScores, top_k_indices, top_k_indices_lote
+    from Backend.pesos import DEFAULT_WEIGHTS
+
+    rnd = random.Random(0)
+    motor = MotorScores.desde_documentos(docs, VARIABLES, DEFAULT_WEIGHTS)
+    espacial = IndiceEspacial(centroides_de(motor.locations), calcular_bboxes(motor.locations, motor.geometrias))
+
+    def prefs_objetivo():
+        return {v: rnd.choice([-1.0, 0.0, 0.5, 1.0]) for v in VARIABLES}
+
+    def sub_pesos():
+        return {"salut": {"aire": rnd.random(), "verde": rnd.random()}}
+
+    print("  -- puntuación (MotorScores) --")
+    imprimir("objetivo + top-3", medir(lambda: top_k_indices(motor.puntuar_objetivo({"precio": 0.0, "ocio": 1.0}), 3),
+                                       repeticiones))
+    imprimir("pesos + top-3", medir(lambda: top_k_indices(motor.puntuar_pesos({"precio": 0.5, "ocio": 0.5}), 3),
+                                    repeticiones))
+
+    lote = [prefs_objetivo() for _ in range(64)]
+    tiempos = medir(lambda: top_k_indices_lote(motor.puntuar_objetivo_lote(lote)[0], 3), max(5, repeticiones // 10))
+    imprimir("lote objetivo (64 prefs)", tiempos, extra=f"({64 * len(tiempos) / sum(tiempos):,.0f} prefs/s)")
+
+    imprimir("sub-pesos nuevos (fallo de caché)", medir(lambda: motor.con_sub_pesos(sub_pesos()), max(5, repeticiones // 10)))
+    fijos = sub_pesos()
+    imprimir("sub-pesos repetidos (acierto)", medir(lambda: motor.con_sub_pesos(fijos), repeticiones))
+
+    def con_radio():
+        candidatos = espacial.en_radio(34.05, -118.25, 5.0)
+        scores = motor.puntuar_objetivo({"precio": 0.0}, candidatos)
+        return candidatos[top_k_indices(scores, 3)]
+    imprimir("radio 5 km + objetivo + top-3", medir(con_radio, repeticiones))
+
+
+# === ENDPOINTS ===
+def bench_endpoints(api, barrios_store, peticiones: int):
+    from fastapi.testclient import TestClient
+    rnd = random.Random(1)
+    casos = [
+        ("api", api, "/api/recomendar_desde_prefs", lambda: {"prefs": {"precio": 0.0, "seguridad": 1.0},
+                                                             "incluir_geometria": False}),
+        ("api", api, "/api/recomendar_desde_prefs", lambda: {"prefs": {"precio": 0.0, "seguridad": 1.0}}),
+        ("api", api, "/api/recomendar_desde_prefs", lambda: {
+            "prefs": {"salut": 1.0}, "incluir_geometria": False,
+            "sub_pesos": {"salut": {"aire": rnd.choice([0.1, 0.5, 0.9])}}}),
+        ("api", api, "/api/recomendar_desde_prefs", lambda: {
+            "prefs": {"precio": 0.0}, "incluir_geometria": False,
+            "zona": {"centro": {"lat": 34.05, "lon": -118.25}, "radio_km": 5}}),
+        ("api", api, "/api/recomendar_desde_texto", lambda: {"texto": rnd.choice(TEXTOS), "incluir_geometria": False}),
+        ("api", api, "/api/recomendar_batch", lambda: {"prefs": [{"precio": rnd.random()} for _ in range(32)],
+                                                       "incluir_geometria": False}),
+        ("store", barrios_store, "/api/recomendar_desde_prefs", lambda: {"prefs": {"precio": 1, "ocio": 2},
+                                                                         "incluir_geometria": False}),
+        ("store", barrios_store, "/api/recomendar_desde_texto", lambda: {"texto": rnd.choice(TEXTOS),
+                                                                         "incluir_geometria": False}),
+    ]
+    etiquetas = ["prefs ligero", "prefs con geometría", "prefs + sub-pesos", "prefs + radio 5 km",
+                 "texto (LLM falso)", "batch 32", "prefs ligero", "texto (LLM falso)"]
+
+    print("  -- endpoints (TestClient, secuencial) --")
+    clientes = {}
+    for (app_nombre, modulo, ruta, cuerpo), etiqueta in zip(casos, etiquetas):
+        cliente = clientes.setdefault(app_nombre, TestClient(modulo.app))
+
+        tiempos, etapas = [], defaultdict(list)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cliente.post(ruta, json=cuerpo())
+            for _ in range(peticiones):
+                t0 = time.perf_counter()
+                r = cliente.post(ruta, json=cuerpo())
+                tiempos.append(time.perf_counter() - t0)
+                for parte in r.headers.get("server-timing", "").split(","):
+                    if ";dur=" in parte:
+                        nombre, dur = parte.strip().split(";dur=")
+                        etapas[nombre].append(float(dur))
+
+        desglose = " ".join(f"{n}={np.percentile(v, 50):.2f}" for n, v in etapas.items() if n != "total")
+        imprimir(f"{app_nombre} {etiqueta}", tiempos, extra=f"[p50 ms: {desglose}]")
+
+    # Contadores que expone /metrics (caché del LLM y vistas de sub-pesos)
+    texto = clientes["api"].get("/metrics").text
+    claves = ("llm_cache_aciertos_total", "llm_cache_fallos_total", "llm_fallback_total",
+              "vistas_sub_pesos_aciertos_total", "vistas_sub_pesos_fallos_total")
+    print("  -- /metrics (api) --")
+    for linea in texto.splitlines():
+        if not linea.startswith("#") and any(c in linea for c in claves):
+            print(f"    {linea}")
+
+
+# === SEED ===
+def bench_seed(docs, directorio: str, mongo, workers: int):
+    from Backend import seed_barrios
+    from benchmarks.sintetico import escribir_entrada_seed, modificar_csv
+
+    entrada = os.path.join(directorio, f"seed_{len(docs)}")
+    geojson = escribir_entrada_seed(docs, entrada)
+    args = ["--datos", entrada, "--geojson", geojson, "--workers", str(workers), "--db", f"bench_seed_{len(docs)}"]
+
+    print(f"  -- seed ({workers} workers) --")
+    for etiqueta, preparar in [("carga inicial", None), ("recarga sin cambios", None),
+                               ("recarga con 1% modificado", lambda: modificar_csv(entrada, "precio", 0.01))]:
+        if preparar:
+            preparar()
+        with contextlib.redirect_stdout(io.StringIO()) as salida:
+            t0 = time.perf_counter()
+            seed_barrios.main(args)
+            dur = time.perf_counter() - t0
+        cambios = [l.strip() for l in salida.getvalue().splitlines() if l.startswith(("➕", "✏️"))]
+        print(f"  {etiqueta:<34} {dur * 1e3:10.1f} ms | {len(docs) / dur:10.0f} barrios/s  "
+              f"({'; '.join(c.split(' ->')[0] for c in cambios)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--peticiones", type=int, default=200, help="Peticiones por caso de endpoint")
+    parser.add_argument("--repeticiones", type=int, default=500, help="Repeticiones por caso de puntuación")
+    parser.add_argument("--retardo-llm", type=float, default=0.0, help="Latencia simulada del LLM (s)")
+    parser.add_argument("--workers-seed", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--sin-endpoints", action="store_true")
+    parser.add_argument("--sin-seed", action="store_true")
+    args = parser.parse_args()
+
+    from benchmarks.sintetico import documentos_sinteticos
+
+    with tempfile.TemporaryDirectory(prefix="bench_barrios_") as directorio:
+        mongo, llm = preparar_entorno(directorio, args.retardo_llm)
+        try:
+            apps = []
+            if not args.sin_endpoints:
+                # La API compila su primer snapshot al importarse: le damos el dataset más pequeño
+                mongo["joc_de_barris"]["barrios"].insert_many(documentos_sinteticos(min(args.tamanos)))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    from Backend import api, barrios_store
+                apps = [api, barrios_store]
+
+            for n in args.tamanos:
+                t0 = time.perf_counter()
+                docs = documentos_sinteticos(n)
+                print(f"\n=== {n:,} barrios (generados en {time.perf_counter() - t0:.1f} s) ===")
+
+                bench_puntuacion(docs, args.repeticiones)
+                if apps:
+                    compilar = cargar_dataset(mongo, apps, docs)
+                    print(f"  snapshot compilado y mapeado en {compilar * 1e3:.0f} ms")
+                    bench_endpoints(*apps, args.peticiones)
+                if not args.sin_seed:
+                    bench_seed(docs, directorio, mongo, args.workers_seed)
+
+            print(f"\nLlamadas al LLM falso: {llm.llamadas}")
+        finally:
+            llm.cerrar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
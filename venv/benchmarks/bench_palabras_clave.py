@@ -0,0 +1,93 @@
+"""
+Benchmark del análisis por palabras clave (modo degradado cuando el LLM no está o está saturado).
+
+Compara el matcher compilado (Backend/palabras_clave.py) con los `any(w in texto ...)` de antes
+sobre textos cortos y largos, y mide cómo escala al crecer el vocabulario.
+
+Uso (desde la carpeta que contiene Backend/):
+    python -m benchmarks.bench_palabras_clave
+"""
+import json
+import os
+import random
+import string
+import tempfile
+import time
+
+from Backend.palabras_clave import MotorPalabrasClave, RUTA_REGLAS
+
+VARIABLES = ["salut", "transporte", "precio", "ocio", "seguridad", "densidad_poblacion"]
+
+TEXTO_CORTO = "Quiero un barrio barato y seguro con parques"
+TEXTO_LARGO = (
+    "Busco un sitio tranquilo para vivir con mi familia, que tenga parques y zonas verdes cerca, "
+    "buen transporte público (metro o bus) para ir al centro, y que no sea muy caro. Odio la fiesta "
+    "y el ruido de los bares por la noche, y me da miedo que haya robos en la zona. "
+) * 20
+
+
+def analisis_lineal(texto: str, reglas) -> dict:
+    """Implementación anterior: un `any(w in texto ...)` por regla."""
+    texto = texto.lower()
+    scores = {v: -1.0 for v in VARIABLES}
+    for palabras, variables in reglas:
+        if any(w in texto for w in palabras):
+            scores.update(variables)
+    return scores
+
+
+def medir(fn, texto: str, repeticiones: int) -> float:
+    """Microsegundos por llamada."""
+    fn(texto)
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        fn(texto)
+    return (time.perf_counter() - t0) / repeticiones * 1e6
+
+
+def vocabulario_sintetico(n_palabras: int) -> dict:
+    with open(RUTA_REGLAS, "r", encoding="utf-8") as f:
+        tabla = json.load(f)
+
+    rnd = random.Random(42)
+    extra = ["".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(5, 12))) for _ in range(n_palabras)]
+    # Repartimos las palabras inventadas entre las reglas existentes
+    for i, palabra in enumerate(extra):
+        tabla["objetivos"][i % len(tabla["objetivos"])]["palabras"].append(palabra)
+    return tabla
+
+
+def main():
+    print("--- Textos cortos y largos (vocabulario actual) ---")
+    motor = MotorPalabrasClave("objetivos")
+    with open(RUTA_REGLAS, "r", encoding="utf-8") as f:
+        reglas = [(r["palabras"], r["variables"]) for r in json.load(f)["objetivos"]]
+
+    for nombre, texto, reps in [("corto", TEXTO_CORTO, 20000), ("largo", TEXTO_LARGO, 500)]:
+        us_lineal = medir(lambda t: analisis_lineal(t, reglas), texto, reps)
+        us_compilado = medir(lambda t: motor.analizar(t, VARIABLES), texto, reps)
+        print(f"{nombre:>6} ({len(texto):>5} chars): lineal {us_lineal:9.1f} us | "
+              f"compilado {us_compilado:9.1f} us | {1e6 / us_compilado:10.0f} textos/s")
+
+    print("\n--- Escalado con el vocabulario (texto largo) ---")
+    for n in [0, 1000, 5000, 20000]:
+        tabla = vocabulario_sintetico(n)
+        reglas = [(r["palabras"], r["variables"]) for r in tabla["objetivos"]]
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            json.dump(tabla, f)
+        try:
+            t0 = time.perf_counter()
+            motor = MotorPalabrasClave("objetivos", ruta=f.name)
+            ms_compilar = (time.perf_counter() - t0) * 1e3
+        finally:
+            os.unlink(f.name)
+
+        us_lineal = medir(lambda t: analisis_lineal(t, reglas), TEXTO_LARGO, 20)
+        us_compilado = medir(lambda t: motor.analizar(t, VARIABLES), TEXTO_LARGO, 200)
+        print(f"{motor.compiladas.n_palabras:>6} palabras: lineal {us_lineal:10.1f} us | "
+              f"compilado {us_compilado:8.1f} us | compilar {ms_compilar:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
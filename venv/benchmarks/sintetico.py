@@ -0,0 +1,259 @@
+"""
+Piezas comunes de los benchmarks: datasets sintéticos de barrios (con geometría), un sustituto de
+MongoDB en memoria y un LLM de pega con la misma API de chat/completions.
+"""
+import copy
+import csv
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+from pymongo import DeleteMany, ReplaceOne
+
+from Backend.pesos import DEFAULT_WEIGHTS
+from Backend.seed_barrios import COLUMN_MAPPING, CSV_FILES, generate_hexagon, slugify
+
+# Zona aproximada de Los Ángeles sobre la que se reparten los barrios sintéticos
+LAT_MIN, LAT_MAX = 33.70, 34.35
+LON_MIN, LON_MAX = -118.70, -118.10
+
+
+# === DATOS SINTÉTICOS ===
+def nombres_sinteticos(n: int) -> List[str]:
+    return [f"Barrio {i:06d}" for i in range(n)]
+
+
+def documentos_sinteticos(n: int, semilla: int = 0) -> List[Dict[str, Any]]:
+    """Documentos como los que escribe el seed: coords, sub_coords, location y un hexágono por barrio."""
+    rng = np.random.default_rng(semilla)
+    lado = max(1, math.ceil(math.sqrt(n)))
+    # Radio del hexágono en km para que la rejilla cubra la zona sin solaparse demasiado
+    radio = max(0.05, (LAT_MAX - LAT_MIN) * 111.0 / lado / 2)
+
+    docs = []
+    for i, nombre in enumerate(nombres_sinteticos(n)):
+        lat = LAT_MIN + (i // lado + 0.5) * (LAT_MAX - LAT_MIN) / lado
+        lon = LON_MIN + (i % lado + 0.5) * (LON_MAX - LON_MIN) / lado
+
+        sub_coords, coords = {}, {}
+        for cat, pesos in DEFAULT_WEIGHTS.items():
+            valores = np.round(rng.random(len(pesos)), 4)
+            sub_coords[cat] = dict(zip(pesos, valores.tolist()))
+            # Media ponderada con los pesos por defecto, como el seed
+            coords[cat] = round(float(np.average(valores, weights=list(pesos.values()))), 4)
+
+        docs.append({
+            "_id": slugify(nombre),
+            "nombre": nombre,
+            "coords": coords,
+            "sub_coords": sub_coords,
+            "location": {"lat": lat, "lon": lon},
+            "geometry": {"type": "Polygon", "coordinates": generate_hexagon(lat, lon, radio)},
+        })
+    return docs
+
+
+def columnas_csv() -> Dict[str, List[Tuple[str, str]]]:
+    """Para cada categoría, (columna CSV, sub-variable) usando la primera columna que el seed mapea."""
+    columnas = {}
+    for cat, pesos in DEFAULT_WEIGHTS.items():
+        columnas[cat] = [(next(c for c, s in COLUMN_MAPPING.items() if s == sub), sub) for sub in pesos]
+    return columnas
+
+
+def escribir_entrada_seed(docs: List[Dict[str, Any]], directorio: str, erratas: float = 0.05,
+                          semilla: int = 0) -> str:
+    """
+    Escribe los seis CSVs y un GeoJSON para el seed. Una fracción de los nombres del GeoJSON lleva
+    una errata, para que pasen por el emparejado aproximado. Devuelve la ruta del GeoJSON.
+    """
+    rnd = random.Random(semilla)
+    os.makedirs(directorio, exist_ok=True)
+    columnas = columnas_csv()
+
+    for cat, fichero in CSV_FILES.items():
+        with open(os.path.join(directorio, fichero), "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["nombre"] + [c for c, _ in columnas[cat]])
+            for doc in docs:
+                w.writerow([doc["nombre"]] + [doc["sub_coords"][cat][sub] for _, sub in columnas[cat]])
+
+    features = []
+    for doc in docs:
+        nombre = doc["nombre"]
+        if rnd.random() < erratas:
+            nombre = nombre.replace("Barrio", "Bario")
+        features.append({"type": "Feature", "properties": {"name": nombre}, "geometry": doc["geometry"]})
+
+    ruta_geojson = os.path.join(directorio, "barrios.geojson")
+    with open(ruta_geojson, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+    return ruta_geojson
+
+
+def modificar_csv(directorio: str, categoria: str, fraccion: float, semilla: int = 1) -> int:
+    """Cambia el primer valor de una fracción de las filas de un CSV. Devuelve cuántas."""
+    rnd = random.Random(semilla)
+    ruta = os.path.join(directorio, CSV_FILES[categoria])
+    with open(ruta, newline="", encoding="utf-8") as f:
+        filas = list(csv.reader(f))
+
+    cambiadas = 0
+    for fila in filas[1:]:
+        if rnd.random() < fraccion:
+            fila[1] = str(round(rnd.random(), 4))
+            cambiadas += 1
+
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(filas)
+    return cambiadas
+
+
+# === MONGO EN MEMORIA ===
+class ColeccionMemoria:
+    """Lo justo de la API de pymongo que usan el seed y el snapshot. Devuelve copias, como Mongo."""
+
+    def __init__(self):
+        self._docs: Dict[Any, Dict[str, Any]] = {}
+
+    def _coincide(self, doc, filtro) -> bool:
+        for campo, cond in (filtro or {}).items():
+            if isinstance(cond, dict) and "$in" in cond:
+                if doc.get(campo) not in cond["$in"]:
+                    return False
+            elif doc.get(campo) != cond:
+                return False
+        return True
+
+    def _candidatos(self, filtro) -> List[Dict[str, Any]]:
+        # Filtros por _id sin recorrer la colección (como el índice de _id de Mongo)
+        cond = (filtro or {}).get("_id")
+        if cond is None:
+            return list(self._docs.values())
+        ids = cond["$in"] if isinstance(cond, dict) and "$in" in cond else [cond]
+        return [self._docs[i] for i in ids if i in self._docs]
+
+    def find(self, filtro=None, proyeccion=None):
+        for doc in self._candidatos(filtro):
+            if self._coincide(doc, filtro):
+                if proyeccion:
+                    yield {k: copy.deepcopy(v) for k, v in doc.items() if k == "_id" or proyeccion.get(k)}
+                else:
+                    yield copy.deepcopy(doc)
+
+    def find_one(self, filtro=None):
+        return next(self.find(filtro), None)
+
+    def count_documents(self, filtro=None) -> int:
+        return sum(1 for doc in self._candidatos(filtro) if self._coincide(doc, filtro))
+
+    def insert_many(self, docs):
+        for doc in docs:
+            self._docs[doc["_id"]] = copy.deepcopy(doc)
+
+    def replace_one(self, filtro, doc, upsert=False):
+        actual = next((d for d in self._candidatos(filtro) if self._coincide(d, filtro)), None)
+        if actual is not None or upsert:
+            nuevo = copy.deepcopy(doc)
+            nuevo.setdefault("_id", (actual or filtro)["_id"])
+            self._docs[nuevo["_id"]] = nuevo
+
+    def delete_many(self, filtro):
+        for doc in [d for d in self._candidatos(filtro) if self._coincide(d, filtro)]:
+            del self._docs[doc["_id"]]
+
+    def update_one(self, filtro, cambios, upsert=False):
+        doc = next((d for d in self._candidatos(filtro) if self._coincide(d, filtro)), None)
+        if doc is None:
+            if not upsert:
+                return
+            doc = self._docs.setdefault(filtro["_id"], {"_id": filtro["_id"]})
+        for campo, valor in cambios.get("$set", {}).items():
+            doc[campo] = valor
+        for campo, valor in cambios.get("$inc", {}).items():
+            doc[campo] = doc.get(campo, 0) + valor
+
+    def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            if isinstance(op, ReplaceOne):
+                self.replace_one(op._filter, op._doc, upsert=op._upsert)
+            elif isinstance(op, DeleteMany):
+                self.delete_many(op._filter)
+            else:
+                raise NotImplementedError(type(op).__name__)
+
+
+class MongoMemoria:
+    """Sustituto de MongoClient: cliente[db][coleccion] -> ColeccionMemoria."""
+
+    def __init__(self, *args, **kwargs):
+        self._dbs: Dict[str, Dict[str, ColeccionMemoria]] = {}
+
+    def __getitem__(self, nombre: str) -> "_BaseDatosMemoria":
+        return _BaseDatosMemoria(self._dbs.setdefault(nombre, {}))
+
+
+class _BaseDatosMemoria:
+    def __init__(self, colecciones: Dict[str, ColeccionMemoria]):
+        self._colecciones = colecciones
+
+    def __getitem__(self, nombre: str) -> ColeccionMemoria:
+        return self._colecciones.setdefault(nombre, ColeccionMemoria())
+
+
+# === LLM DE PEGA ===
+class LLMFalso:
+    """
+    Servidor HTTP local con la forma de /v1/chat/completions. Devuelve un JSON de preferencias
+    determinista por texto, tras `retardo` segundos (para simular la latencia del proveedor).
+    """
+
+    def __init__(self, variables: List[str], retardo: float = 0.0):
+        self.variables = variables
+        self.retardo = retardo
+        self.llamadas = 0
+        falso = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_POST(self):
+                cuerpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                texto = cuerpo["messages"][-1]["content"]
+                falso.llamadas += 1
+                if falso.retardo:
+                    threading.Event().wait(falso.retardo)
+
+                semilla = int(hashlib.sha1(texto.encode("utf-8")).hexdigest()[:8], 16)
+                rnd = random.Random(semilla)
+                prefs = {v: rnd.choice([-1.0, 0.0, 1.0]) for v in falso.variables}
+                respuesta = json.dumps({"choices": [{"message": {"content": json.dumps(prefs)}}]}).encode("utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(respuesta)))
+                self.end_headers()
+                self.wfile.write(respuesta)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.endpoint = f"http://127.0.0.1:{self._servidor.server_address[1]}/v1/chat/completions"
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+
+    def cerrar(self):
+        self._servidor.shutdown()
+
+
+def percentiles(tiempos: List[float], total: Optional[float] = None) -> Tuple[float, float, float]:
+    """(p50 ms, p99 ms, operaciones/s). Sin total, el throughput sale de la suma de tiempos."""
+    t = np.asarray(tiempos, dtype=np.float64)
+    if not len(t):
+        return 0.0, 0.0, 0.0
+    total = t.sum() if total is None else total
+    return float(np.percentile(t, 50) * 1e3), float(np.percentile(t, 99) * 1e3), len(t) / total if total else 0.0
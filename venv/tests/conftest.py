@@ -0,0 +1,51 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Los tests se lanzan desde venv/ (python -m pytest tests) o desde cualquier otro sitio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+N_BARRIOS = 200
+
+
+@pytest.fixture(scope="session")
+def docs_seed():
+    """Documentos que el seed construye con los CSVs y el GeoJSON reales del repositorio."""
+    from Backend.seed_barrios import IndiceNombres, cargar_datos_completos, construir_documento
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        datos, _, geos, nombres_geo = cargar_datos_completos(workers=1)
+    indice = IndiceNombres(nombres_geo)
+    return [construir_documento(bid, data, geos, indice)[0] for bid, data in datos.items()]
+
+
+@pytest.fixture(scope="session")
+def entorno():
+    """Mongo en memoria con barrios sintéticos y un LLM de pega, como en los benchmarks."""
+    from benchmarks.bench_api import preparar_entorno
+    from benchmarks.sintetico import documentos_sinteticos
+
+    directorio = tempfile.mkdtemp(prefix="barrios-tests-")
+    mongo, llm = preparar_entorno(directorio, retardo_llm=0.0)
+    mongo["joc_de_barris"]["barrios"].insert_many(documentos_sinteticos(N_BARRIOS))
+    mongo["joc_de_barris"]["meta"].update_one({"_id": "barrios"}, {"$inc": {"version": 1}}, upsert=True)
+    yield mongo, llm
+    llm.cerrar()
+
+
+@pytest.fixture(scope="session")
+def api(entorno):
+    with contextlib.redirect_stdout(io.StringIO()):
+        from Backend import api
+    return api
+
+
+@pytest.fixture(scope="session")
+def store(entorno):
+    with contextlib.redirect_stdout(io.StringIO()):
+        from Backend import barrios_store
+    return barrios_store
@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(params=["api", "store"])
+def cliente(request):
+    return TestClient(request.getfixturevalue(request.param).app)
+
+
+def test_batch_devuelve_un_resultado_por_prefs(cliente):
+    prefs = [{"salut": 1.0, "precio": 0.2}, {"ocio": 0.9}]
+    r = cliente.post("/api/recomendar_batch", json={"prefs": prefs, "incluir_geometria": False})
+    assert r.status_code == 200
+    assert [len(res["barrios"]) for res in r.json()["resultados"]] == [3, 3]
+
+
+def test_batch_por_encima_del_tope_da_422(cliente, api):
+    prefs = [{"salut": 1.0}] * (api.MAX_PREFS_LOTE + 1)
+    r = cliente.post("/api/recomendar_batch", json={"prefs": prefs})
+    assert r.status_code == 422
+
+
+def test_texto_puntua_en_el_threadpool_y_mide_la_etapa(cliente):
+    r = cliente.post("/api/recomendar_desde_texto", json={"texto": "barato y con metro", "incluir_geometria": False})
+    assert r.status_code == 200
+    assert len(r.json()["barrios"]) == 3
+    # El contexto de la petición llega al hilo: la etapa de puntuación sigue en Server-Timing
+    assert "puntuacion;dur=" in r.headers["server-timing"]
+
+
+def test_texto_por_encima_del_tope_da_422(cliente, api):
+    r = cliente.post("/api/recomendar_desde_texto", json={"texto": "barato " * api.MAX_TEXTO})
+    assert r.status_code == 422
+
+
+@pytest.mark.parametrize("ruta, cuerpo", [
+    ("/api/recomendar_batch", '{"prefs": [{"precio": 1e309}]}'),
+    ("/api/recomendar_batch", '{"prefs": [{"salut": 1.0}, {"precio": NaN}]}'),
+    ("/api/recomendar_desde_prefs", '{"prefs": {"precio": -1e309}}'),
+    ("/api/recomendar_desde_prefs", '{"prefs": {"salut": 1.0}, "sub_pesos": {"seguridad": {"allanamiento": 1e309}}}'),
+    ("/api/recomendar_desde_texto", '{"texto": "barato", "sub_pesos": {"seguridad": {"allanamiento": NaN}}}'),
+])
+def test_valores_no_finitos_dan_422(cliente, ruta, cuerpo):
+    r = cliente.post(ruta, content=cuerpo, headers={"content-type": "application/json"})
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["type"] == "finite_number"
+
+
+def test_respuesta_del_llm_no_finita_se_ignora(api, store):
+    assert api.limpiar_respuesta_llm({"precio": float("nan"), "ocio": 1.0})["precio"] == -1.0
+    assert set(store.limpiar_respuesta_llm({"precio": float("inf"), "ocio": 1.0}).values()) == {0.0, 1.0}
+
+
+@pytest.mark.parametrize("ruta", ["/api/admin/recargar_reglas", "/api/admin/recargar_datos"])
+def test_admin_exige_token(cliente, ruta, monkeypatch, api, store):
+    for app in (api, store):
+        monkeypatch.setattr(app, "ADMIN_TOKEN", None)
+    assert cliente.post(ruta).status_code == 404
+    assert cliente.post(ruta, headers={"X-Admin-Token": ""}).status_code == 404
+
+    for app in (api, store):
+        monkeypatch.setattr(app, "ADMIN_TOKEN", "secreto")
+    assert cliente.post(ruta).status_code == 403
+    assert cliente.post(ruta, headers={"X-Admin-Token": "otro"}).status_code == 403
+
+
+def test_admin_con_token_recarga_las_reglas(cliente, monkeypatch, api, store):
+    for app in (api, store):
+        monkeypatch.setattr(app, "ADMIN_TOKEN", "secreto")
+    r = cliente.post("/api/admin/recargar_reglas", headers={"X-Admin-Token": "secreto"})
+    assert r.status_code == 200 and r.json()["palabras"] > 0
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+
+from Backend.cliente_llm import ClienteLLM
+from benchmarks.sintetico import LLMFalso
+
+VARIABLES = ["salut", "transporte", "precio", "ocio", "seguridad", "densidad_poblacion"]
+FALLBACK = {v: -1.0 for v in VARIABLES}
+
+
+@pytest.fixture
+def llm():
+    falso = LLMFalso(VARIABLES, retardo=0.2)
+    yield falso
+    falso.cerrar()
+
+
+def crear_cliente(endpoint, api_key="test", **kwargs) -> ClienteLLM:
+    return ClienteLLM(endpoint, api_key, "modelo", "prompt",
+                      limpiar=lambda raw: {k: float(v) for k, v in raw.items()},
+                      fallback=lambda texto: dict(FALLBACK), **kwargs)
+
+
+def ejecutar(cliente: ClienteLLM, corutina):
+    async def con_cierre():
+        try:
+            return await corutina
+        finally:
+            await cliente.cerrar()
+    return asyncio.run(con_cierre())
+
+
+def test_peticiones_identicas_en_vuelo_se_agrupan(llm):
+    cliente = crear_cliente(llm.endpoint)
+    textos = ["Barato y seguro", "barato  y SEGURO", " barato y seguro "] * 3
+
+    async def todas():
+        return await asyncio.gather(*(cliente.traducir(t) for t in textos))
+
+    resultados = ejecutar(cliente, todas())
+    assert llm.llamadas == 1
+    assert all(r == resultados[0] for r in resultados)
+    assert resultados[0] != FALLBACK
+
+
+def test_cache_caduca_tras_el_ttl(llm):
+    llm.retardo = 0.0
+    cliente = crear_cliente(llm.endpoint, cache_ttl=0.2)
+
+    async def tres_llamadas():
+        primera = await cliente.traducir("con parques")
+        await cliente.traducir("con parques")  # dentro del TTL: caché
+        llamadas_antes = llm.llamadas
+        await asyncio.sleep(0.3)
+        tercera = await cliente.traducir("con parques")  # caducada: vuelve a preguntar
+        return primera, llamadas_antes, tercera
+
+    primera, llamadas_antes, tercera = ejecutar(cliente, tres_llamadas())
+    assert llamadas_antes == 1
+    assert llm.llamadas == 2
+    assert primera == tercera
+    assert cliente.cache.aciertos == 1
+
+
+def test_saturado_responde_con_fallback_sin_esperar(llm):
+    cliente = crear_cliente(llm.endpoint, max_concurrencia=1)
+
+    async def dos_textos():
+        lenta = asyncio.create_task(cliente.traducir("texto lento"))
+        await asyncio.sleep(0.05)  # la primera ya tiene el único hueco
+        t0 = time.perf_counter()
+        saturada = await cliente.traducir("otro texto distinto")
+        espera = time.perf_counter() - t0
+        return await lenta, saturada, espera
+
+    lenta, saturada, espera = ejecutar(cliente, dos_textos())
+    assert lenta != FALLBACK
+    assert saturada == FALLBACK
+    assert espera < 0.1
+    assert cliente.fallbacks["saturado"] == 1
+    assert llm.llamadas == 1
+
+
+def test_error_y_sin_api_key_usan_fallback(llm):
+    caido = crear_cliente("http://127.0.0.1:9/v1/chat/completions", timeout=0.5)
+    assert ejecutar(caido, caido.traducir("hola")) == FALLBACK
+    assert caido.fallbacks["error"] == 1
+
+    sin_clave = crear_cliente(llm.endpoint, api_key=None)
+    assert ejecutar(sin_clave, sin_clave.traducir("hola")) == FALLBACK
+    assert sin_clave.fallbacks["sin_api_key"] == 1
+    assert llm.llamadas == 0
@@ -0,0 +1,47 @@
+import numpy as np
+
+from Backend.espacial import IndiceEspacial, bbox_geometria, calcular_bboxes, centroide_geometria, centroides_de
+
+DOWNTOWN = (34.0522, -118.2437)
+
+
+def cuadrado(lon, lat, lado):
+    return [[lon, lat], [lon + lado, lat], [lon + lado, lat + lado], [lon, lat + lado], [lon, lat]]
+
+
+def test_centroide_de_poligono_y_multipoligono():
+    assert np.allclose(centroide_geometria({"type": "Polygon", "coordinates": [cuadrado(0, 0, 2)]}), (1, 1))
+    # El polígono grande pesa 4 veces más que el pequeño
+    multi = {"type": "MultiPolygon", "coordinates": [[cuadrado(0, 0, 2)], [cuadrado(10, 0, 1)]]}
+    assert np.allclose(centroide_geometria(multi), ((4 * 1 + 1 * 0.5) / 5, (4 * 1 + 1 * 10.5) / 5))
+    assert centroide_geometria({"type": "Point", "coordinates": [1, 2]}) is None
+    assert centroide_geometria(None) is None
+
+
+def indice(docs):
+    locations = [d["location"] for d in docs]
+    return IndiceEspacial(centroides_de(locations), calcular_bboxes(locations, [d["geometry"] for d in docs]))
+
+
+def test_el_seed_guarda_el_centroide_de_cada_geometria(docs_seed):
+    for doc in docs_seed:
+        min_lon, min_lat, max_lon, max_lat = bbox_geometria(doc["geometry"])
+        assert min_lon <= doc["location"]["lon"] <= max_lon
+        assert min_lat <= doc["location"]["lat"] <= max_lat
+    # Antes casi todos caían en el punto por defecto del centro
+    en_el_punto_por_defecto = [d for d in docs_seed if (d["location"]["lat"], d["location"]["lon"]) == DOWNTOWN]
+    assert en_el_punto_por_defecto == []
+
+
+def test_filtros_por_zona_con_los_datos_reales(docs_seed):
+    ie = indice(docs_seed)
+    nombres = [d["nombre"] for d in docs_seed]
+
+    cerca_del_centro = {nombres[i] for i in ie.en_radio(*DOWNTOWN, 5.0)}
+    assert "Downtown" in cerca_del_centro
+    assert "Tujunga" not in cerca_del_centro and "San Pedro" not in cerca_del_centro
+    assert len(cerca_del_centro) < len(docs_seed) // 3
+
+    san_pedro = docs_seed[nombres.index("San Pedro")]["location"]
+    caja = [san_pedro["lon"] - 0.02, san_pedro["lat"] - 0.02, san_pedro["lon"] + 0.02, san_pedro["lat"] + 0.02]
+    assert "San Pedro" in {nombres[i] for i in ie.en_bbox(*caja)}
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from Backend.geometrias import acepta_gzip
+
+
+@pytest.mark.parametrize("cabecera, esperado", [
+    ("gzip", True),
+    ("gzip, deflate, br", True),
+    ("br;q=1.0, gzip;q=0.5", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0.000, identity", False),
+    ("*", True),
+    ("*;q=0", False),
+    ("deflate, br", False),
+    (None, False),
+])
+def test_acepta_gzip(cabecera, esperado):
+    assert acepta_gzip(cabecera) is esperado
+
+
+def pedir(cliente, codificacion, etag=None):
+    cabeceras = {"Accept-Encoding": codificacion}
+    if etag:
+        cabeceras["If-None-Match"] = etag
+    return cliente.get("/api/geometrias?nivel=1", headers=cabeceras)
+
+
+def test_etag_distinto_por_codificacion(api):
+    cliente = TestClient(api.app)
+    con_gzip = pedir(cliente, "gzip")
+    sin_gzip = pedir(cliente, "identity")
+    rechaza_gzip = pedir(cliente, "gzip;q=0")
+
+    assert con_gzip.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in sin_gzip.headers
+    assert "content-encoding" not in rechaza_gzip.headers
+    assert con_gzip.headers["etag"] != sin_gzip.headers["etag"]
+    assert sin_gzip.headers["etag"] == rechaza_gzip.headers["etag"]
+    assert json.loads(sin_gzip.content)["type"] == "FeatureCollection"
+
+
+def test_304_solo_con_el_etag_de_la_misma_codificacion(api):
+    cliente = TestClient(api.app)
+    etag_gzip = pedir(cliente, "gzip").headers["etag"]
+    etag_plano = pedir(cliente, "identity").headers["etag"]
+
+    assert pedir(cliente, "gzip", etag_gzip).status_code == 304
+    assert pedir(cliente, "gzip", "W/" + etag_gzip).status_code == 304
+    assert pedir(cliente, "identity", etag_plano).status_code == 304
+    assert pedir(cliente, "identity", etag_gzip).status_code == 200
+    assert pedir(cliente, "gzip", etag_plano).status_code == 200
+
+
+def test_siempre_se_revalida(api):
+    # Sin max-age: tras una recarga del dataset el navegador no puede quedarse con polígonos viejos
+    cliente = TestClient(api.app)
+    r = pedir(cliente, "gzip")
+    assert r.headers["cache-control"] == "no-cache"
+    assert pedir(cliente, "gzip", r.headers["etag"]).headers["cache-control"] == "no-cache"
@@ -0,0 +1,29 @@
+from fastapi.testclient import TestClient
+
+
+def etapas(respuesta):
+    return dict(parte.strip().split(";dur=") for parte in respuesta.headers["server-timing"].split(","))
+
+
+def test_server_timing_y_metrics(api):
+    cliente = TestClient(api.app)
+    r = cliente.post("/api/recomendar_desde_prefs", json={"prefs": {"salut": 1.0}, "incluir_geometria": False})
+    medidas = etapas(r)
+    assert {"puntuacion", "serializacion", "resto", "total"} <= set(medidas)
+    # "resto" es lo que queda fuera de las etapas medidas: todas suman el total
+    partes = sum(float(v) for k, v in medidas.items() if k != "total")
+    assert abs(partes - float(medidas["total"])) < 0.05
+    assert r.json()["barrios"] and "geometry" not in r.json()["barrios"][0]
+
+    texto = cliente.get("/metrics").text
+    assert 'barrios_peticiones_total{codigo="200",ruta="/api/recomendar_desde_prefs"}' in texto
+    assert 'barrios_etapa_segundos_count{etapa="resto"}' in texto
+    assert 'barrios_etapa_segundos_count{etapa="serializacion"}' in texto
+
+
+def test_sin_prints_en_el_camino_de_cada_peticion(api, capsys):
+    cliente = TestClient(api.app)
+    capsys.readouterr()
+    cliente.post("/api/recomendar_desde_texto", json={"texto": "barato con bares", "incluir_geometria": False})
+    api.analisis_por_palabras_clave("barato con bares")
+    assert capsys.readouterr().out == ""
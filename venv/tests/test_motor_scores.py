@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from Backend.motor_scores import MotorScores
+from Backend.pesos import DEFAULT_WEIGHTS
+
+VARIABLES = ["salut", "transporte", "precio", "ocio", "seguridad", "densidad_poblacion"]
+
+
+@pytest.fixture(scope="module")
+def motor(docs_seed):
+    """Motor con los CSVs reales pasados por el seed."""
+    return MotorScores.desde_documentos(docs_seed, VARIABLES, DEFAULT_WEIGHTS)
+
+
+def test_sub_pesos_por_defecto_no_cambian_nada(motor):
+    for cat, subs in DEFAULT_WEIGHTS.items():
+        for sub, peso in subs.items():
+            assert motor.con_sub_pesos({cat: {sub: peso}}) is motor
+    assert motor.con_sub_pesos({"seguridad": dict(DEFAULT_WEIGHTS["seguridad"])}) is motor
+
+
+def test_coords_del_seed_son_la_media_ponderada_de_la_vista(motor):
+    # Forzamos la vista con todos los pesos por defecto: misma fórmula que el seed (salvo el redondeo)
+    clave = tuple(sorted((cat, sub, peso) for cat, subs in DEFAULT_WEIGHTS.items() for sub, peso in subs.items()))
+    vista = motor._crear_vista(clave)
+    np.testing.assert_allclose(vista.coords, motor.coords, atol=1e-4)
+
+
+def test_un_override_solo_mueve_su_categoria(motor):
+    vista = motor.con_sub_pesos({"seguridad": {"allanamiento": 0.9}})
+    j = VARIABLES.index("seguridad")
+    otras = [i for i in range(len(VARIABLES)) if i != j]
+    np.testing.assert_array_equal(vista.coords[:, otras], motor.coords[:, otras])
+    assert not np.allclose(vista.coords[:, j], motor.coords[:, j])
+
+
+def test_categoria_con_todos_los_pesos_a_cero_es_desconocida(motor):
+    vista = motor.con_sub_pesos({"precio": {sub: 0.0 for sub in DEFAULT_WEIGHTS["precio"]}})
+    j = VARIABLES.index("precio")
+    assert np.isnan(vista.coords[:, j]).all()
+    # "barato" ya no casa perfectamente con todos: la variable queda como indiferente (0.5)
+    scores = vista.puntuar_objetivo({"precio": 0.0})
+    np.testing.assert_allclose(scores, 0.5)
+    assert "precio" not in vista.coords_de(0)
+
+
+def test_cache_de_vistas_acotada_por_memoria(monkeypatch):
+    import Backend.motor_scores as ms
+
+    def motor_de(n):
+        coords = np.zeros((n, len(VARIABLES)), dtype=np.float32)
+        return MotorScores(VARIABLES, [str(i) for i in range(n)], [""] * n, coords, [], [])
+
+    assert motor_de(100).info_cache_vistas().maxsize == ms.MAX_VISTAS_CACHE
+    grande = motor_de(100_000)
+    assert grande.info_cache_vistas().maxsize * 3 * grande.coords.nbytes <= ms.MAX_BYTES_VISTAS_CACHE
+    monkeypatch.setattr(ms, "MAX_BYTES_VISTAS_CACHE", 0)
+    assert motor_de(100).info_cache_vistas().maxsize == 1
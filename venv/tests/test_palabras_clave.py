@@ -0,0 +1,136 @@
+import json
+import os
+import random
+import shutil
+import time
+
+import pytest
+
+from Backend.palabras_clave import RUTA_REGLAS, MotorPalabrasClave
+
+VARIABLES = ["salut", "transporte", "precio", "ocio", "seguridad", "densidad_poblacion"]
+
+
+# --- IMPLEMENTACIÓN ANTERIOR (referencia) ---
+# Copia de los analisis_por_palabras_clave de api.py y barrios_store.py antes de la tabla de reglas
+# (sin la normalización final de barrios_store, que no es parte del matcher).
+def objetivos_anterior(texto):
+    texto = texto.lower()
+    scores = {v: -1.0 for v in VARIABLES}
+    if any(w in texto for w in ["barato", "economico", "ahorro", "pobre", "asequible", "rata", "tirado"]):
+        scores["precio"] = 0.0
+    if any(w in texto for w in ["lujo", "caro", "rico", "exclusivo", "dinero"]):
+        scores["precio"] = 1.0
+        scores["seguridad"] = 1.0
+    if any(w in texto for w in ["parque", "aire", "verde", "arbol", "naturaleza", "silencio", "paz"]):
+        scores["salut"] = 1.0
+    if any(w in texto for w in ["seguro", "policia", "vigilancia"]):
+        scores["seguridad"] = 1.0
+    if any(w in texto for w in ["peligro", "miedo", "robo", "crimen", "inseguro"]):
+        scores["seguridad"] = 0.0
+    if any(w in texto for w in ["fiesta", "bares", "noche", "teatro", "cultura", "ocio"]):
+        scores["ocio"] = 1.0
+    if any(w in texto for w in ["metro", "bus", "transporte", "coche", "trafico"]):
+        scores["transporte"] = 1.0
+    if any(w in texto for w in ["gente", "centro", "vida", "tiendas", "urbano"]):
+        scores["densidad_poblacion"] = 1.0
+    return scores
+
+
+def pesos_anterior(texto):
+    texto = texto.lower()
+    scores = {v: 0.0 for v in VARIABLES}
+    if any(w in texto for w in ["parque", "aire", "verde", "arbol", "naturaleza"]):
+        scores["salut"] += 1.0
+    if any(w in texto for w in ["silencio", "tranquilo", "paz"]):
+        scores["salut"] += 0.5
+    if any(w in texto for w in ["barato", "economico", "ahorro", "pobre"]):
+        scores["precio"] += 1.0
+    if any(w in texto for w in ["lujo", "caro", "rico", "exclusivo"]):
+        scores["precio"] += 0.2
+        scores["seguridad"] += 0.5
+    if any(w in texto for w in ["seguro", "policia", "miedo", "robo", "crimen", "vigilancia"]):
+        scores["seguridad"] += 1.0
+    if any(w in texto for w in ["fiesta", "bares", "noche", "teatro", "cultura"]):
+        scores["ocio"] += 1.0
+    if any(w in texto for w in ["metro", "bus", "transporte", "coche", "trafico"]):
+        scores["transporte"] += 1.0
+    if any(w in texto for w in ["gente", "centro", "vida", "tiendas"]):
+        scores["densidad_poblacion"] += 1.0
+    return scores
+
+
+# Vocabulario de las reglas + relleno; sin negaciones, que la versión anterior no tenía
+PALABRAS = ("barato economico ahorro pobre asequible rata tirado lujo caro rico exclusivo dinero parque aire "
+            "verde arbol naturaleza silencio paz seguro policia vigilancia peligro miedo robo crimen inseguro "
+            "fiesta bares noche teatro cultura ocio metro bus transporte coche trafico gente centro vida tiendas "
+            "urbano tranquilo quiero un barrio con y de la casa BARATO Metro").split()
+
+
+def textos_aleatorios(n, semilla=0):
+    rnd = random.Random(semilla)
+    for _ in range(n):
+        # Separadores vacíos o letras sueltas: palabras pegadas y solapadas ("robarato", "inseguro")
+        yield rnd.choice(["", " ", "x", ", "]).join(rnd.choice(PALABRAS) for _ in range(rnd.randint(0, 8)))
+
+
+@pytest.mark.parametrize("seccion, anterior", [("objetivos", objetivos_anterior), ("pesos", pesos_anterior)])
+def test_equivale_a_la_implementacion_anterior(seccion, anterior):
+    motor = MotorPalabrasClave(seccion)
+    distintos = [t for t in textos_aleatorios(20000) if motor.analizar(t, VARIABLES) != anterior(t)]
+    assert distintos == []
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("odio el lujo", {"precio": 0.0}),
+    ("no quiero lujo", {"precio": 0.0}),
+    ("odio la fiesta, quiero algo barato", {"ocio": 0.0, "precio": 0.0}),
+    ("sin crimen y con metro", {"seguridad": 1.0, "transporte": 1.0}),
+    ("sin parques", {}),  # regla sin "negadas": negarla no fija nada
+    ("sin trafico, barato", {"precio": 0.0}),  # la coma corta la negación
+    ("odio el ruido pero quiero bares", {"ocio": 1.0}),
+])
+def test_negacion_por_variable(texto, esperado):
+    scores = MotorPalabrasClave("objetivos").analizar(texto, VARIABLES)
+    assert {v: s for v, s in scores.items() if s != -1.0} == esperado
+
+
+def test_recarga_cuando_cambia_el_fichero(tmp_path):
+    ruta = str(tmp_path / "reglas.json")
+    shutil.copy(RUTA_REGLAS, ruta)
+    # Otro worker con su propio motor sobre el mismo fichero
+    motor = MotorPalabrasClave("objetivos", ruta=ruta, intervalo=0)
+    assert motor.analizar("zona con playa", VARIABLES)["salut"] == -1.0
+
+    with open(ruta, "r", encoding="utf-8") as f:
+        tabla = json.load(f)
+    tabla["objetivos"].append({"palabras": ["playa"], "variables": {"salut": 1.0}})
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(tabla, f)
+    os.utime(ruta, ns=(0, motor.firma[0] + 10**9))
+
+    assert motor.analizar("zona con playa", VARIABLES)["salut"] == 1.0
+
+
+def test_fichero_invalido_mantiene_la_tabla_anterior(tmp_path, capsys):
+    ruta = str(tmp_path / "reglas.json")
+    shutil.copy(RUTA_REGLAS, ruta)
+    motor = MotorPalabrasClave("objetivos", ruta=ruta, intervalo=0)
+
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("{ a medio escribir")
+    os.utime(ruta, ns=(0, motor.firma[0] + 10**9))
+
+    assert motor.analizar("barato", VARIABLES)["precio"] == 0.0
+    assert "No se pudieron recargar" in capsys.readouterr().out
+
+
+def test_muchas_negaciones_no_recorren_el_texto_una_vez_por_negacion():
+    motor = MotorPalabrasClave("objetivos")
+    texto = "sin nada " * 16000 + "pues quiero algo barato"
+    t0 = time.perf_counter()
+    assert motor.analizar(texto, VARIABLES)["precio"] == 0.0
+    assert motor.analizar(texto + " sin lujo", VARIABLES)["precio"] == 0.0
+    # La última negación alcanza a "barato": regla sin "negadas", no fija nada
+    assert motor.analizar("sin nada " * 16000 + "barato", VARIABLES)["precio"] == -1.0
+    assert time.perf_counter() - t0 < 2.0
@@ -0,0 +1,143 @@
+import csv
+import difflib
+import random
+import shutil
+
+import pytest
+
+from Backend import seed_barrios
+from Backend.seed_barrios import (CAMPO_HASH, CSV_FILES, IndiceNombres, aplicar_cambios, leer_csv,
+                                  obtener_geometrias, planificar_cambios)
+from benchmarks.sintetico import MongoMemoria
+
+
+@pytest.fixture
+def datos(tmp_path):
+    """Copia de los CSVs reales, para poder modificarlos."""
+    for fichero in CSV_FILES.values():
+        shutil.copy(f"{seed_barrios.BASE_DIR}/{fichero}", tmp_path / fichero)
+    return tmp_path
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    mongo = MongoMemoria()
+    monkeypatch.setattr(seed_barrios, "MongoClient", lambda *a, **k: mongo)
+    return mongo
+
+
+def seed(datos, *args):
+    return seed_barrios.main(["--datos", str(datos), "--workers", "1", "--db", "db", *args])
+
+
+def version(mongo):
+    meta = mongo["db"]["meta"].find_one({"_id": "barrios"})
+    return meta["version"] if meta else None
+
+
+def test_segunda_carga_no_escribe_nada(datos, mongo, capsys):
+    assert seed(datos) == 0
+    col = mongo["db"]["barrios"]
+    n = col.count_documents({})
+    assert n > 0 and version(mongo) == 1
+
+    assert seed(datos) == 0
+    assert version(mongo) == 1 and col.count_documents({}) == n
+    assert "Sin cambios" in capsys.readouterr().out
+
+
+def test_solo_se_reescriben_los_barrios_modificados(datos, mongo):
+    seed(datos)
+    col = mongo["db"]["barrios"]
+    docs = list(col.find({}))
+    plan = planificar_cambios(col, docs)
+    assert plan["iguales"] and not (plan["nuevos"] or plan["modificados"] or plan["obsoletos"])
+
+    cambiado = dict(docs[0], nombre="Otro nombre")
+    cambiado[CAMPO_HASH] = seed_barrios.hash_documento(cambiado)
+    plan = planificar_cambios(col, [cambiado] + docs[1:])
+    assert plan["modificados"] == [cambiado["_id"]]
+    assert aplicar_cambios(mongo["db"], "barrios", [cambiado] + docs[1:], plan) == 1
+    assert col.find_one({"_id": cambiado["_id"]})["nombre"] == "Otro nombre"
+    assert version(mongo) == 2
+
+
+def test_obsoletos_se_borran_salvo_con_conservar(datos, mongo):
+    seed(datos)
+    col = mongo["db"]["barrios"]
+    col.insert_many([{"_id": "fantasma", "nombre": "Fantasma", CAMPO_HASH: "x"}])
+
+    assert seed(datos, "--conservar-obsoletos") == 0
+    assert col.find_one({"_id": "fantasma"}) is not None
+    assert version(mongo) == 1  # el plan solo tenía el obsoleto y no se ha tocado
+
+    assert seed(datos) == 0
+    assert col.find_one({"_id": "fantasma"}) is None
+    assert version(mongo) == 2
+
+
+def test_dry_run_no_escribe(datos, mongo, capsys):
+    assert seed(datos, "--dry-run") == 0
+    assert mongo["db"]["barrios"].count_documents({}) == 0
+    assert version(mongo) is None
+    salida = capsys.readouterr().out
+    assert "nuevos:" in salida and "Dry-run" in salida
+
+
+def test_informe_de_columnas_sin_mapear(datos, mongo, capsys):
+    ruta = datos / CSV_FILES["ocio"]
+    with open(ruta, newline="", encoding="utf-8") as f:
+        filas = list(csv.reader(f))
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([filas[0] + ["museos_score"]] + [fila + ["0.5"] for fila in filas[1:]])
+
+    _, _, no_mapeadas = leer_csv("ocio", str(ruta))
+    assert no_mapeadas == ["museos_score"]
+    assert seed(datos, "--dry-run") == 0
+    assert f"{CSV_FILES['ocio']}: museos_score" in capsys.readouterr().out
+
+
+# === ÍNDICE DE NOMBRES ===
+@pytest.fixture(scope="module")
+def nombres_geo():
+    _, nombres = obtener_geometrias()
+    return list(dict.fromkeys(nombres))
+
+
+def close_match(nombre, nombres):
+    return (difflib.get_close_matches(nombre, nombres, n=1, cutoff=0.6) or [None])[0]
+
+
+def test_indice_coincide_con_difflib_en_los_nombres_reales(nombres_geo, docs_seed):
+    indice = IndiceNombres(nombres_geo)
+    for doc in docs_seed:
+        assert indice.buscar(doc["nombre"]) == close_match(doc["nombre"], nombres_geo)
+
+
+def mal_escrito(nombre, rnd):
+    letras = list(nombre)
+    for _ in range(rnd.randint(1, 4)):
+        i = rnd.randrange(len(letras) + 1)
+        op = rnd.random()
+        if op < 0.4 and letras:
+            letras[min(i, len(letras) - 1)] = rnd.choice("abcdefghijklmnopqrstuvwxyz ")
+        elif op < 0.7:
+            letras.insert(i, rnd.choice("abcdefghijklmnopqrstuvwxyz"))
+        elif letras:
+            del letras[min(i, len(letras) - 1)]
+    return "".join(letras)
+
+
+def test_indice_aproxima_difflib_con_nombres_mal_escritos(nombres_geo):
+    indice = IndiceNombres(nombres_geo)
+    rnd = random.Random(0)
+    distintos = 0
+    for _ in range(2000):
+        consulta = mal_escrito(rnd.choice(nombres_geo), rnd)
+        propio, referencia = indice.buscar(consulta), close_match(consulta, nombres_geo)
+        if propio is not None:
+            # Nunca por debajo del umbral ni mejor que difflib (que mira todos los nombres; mismo orden de args)
+            ratio = difflib.SequenceMatcher(None, propio, consulta).ratio()
+            assert 0.6 <= ratio <= difflib.SequenceMatcher(None, referencia, consulta).ratio()
+        distintos += propio != referencia
+    assert distintos <= 20  # aproximación: <= 1%
@@ -0,0 +1,55 @@
+import pytest
+
+from Backend import simulacion
+from Backend.pesos import DEFAULT_WEIGHTS
+from Backend.snapshot import compilar_snapshot, publicar_snapshot
+from benchmarks.sintetico import documentos_sinteticos
+
+VARIABLES = ["salut", "transporte", "precio", "ocio", "seguridad", "densidad_poblacion"]
+
+
+@pytest.fixture(scope="module")
+def snapshot_dir(tmp_path_factory):
+    directorio = str(tmp_path_factory.mktemp("snapshot"))
+    publicar_snapshot(compilar_snapshot(documentos_sinteticos(60), VARIABLES, DEFAULT_WEIGHTS, directorio), directorio)
+    return directorio
+
+
+def ejecutar(snapshot_dir, salida, modo, monkeypatch, escenarios_tarea, elementos_tarea, workers):
+    monkeypatch.setattr(simulacion, "ESCENARIOS_TAREA", escenarios_tarea)
+    monkeypatch.setattr(simulacion, "ELEMENTOS_TAREA", elementos_tarea)
+    assert simulacion.main(["--aleatorios", "150", "--modo", modo, "--deltas", "0.3", "-0.1", "--perturbaciones", "",
+                            "--workers", str(workers), "--salida", salida, "--snapshot-dir", snapshot_dir]) == 0
+    # Con varios bloques las filas salen por bloque y luego por escenario: se comparan como conjuntos
+    return [sorted(open(f"{salida}_{tabla}.csv", encoding="utf-8")) for tabla in ("ranking", "estabilidad")]
+
+
+def filas_resumen(capsys):
+    return [linea for linea in capsys.readouterr().out.split("---")[-1].splitlines() if "top-1 igual" in linea]
+
+
+@pytest.mark.parametrize("modo", ["pesos", "objetivo"])
+def test_tramos_de_escenarios_dan_la_misma_salida(snapshot_dir, tmp_path, monkeypatch, capsys, modo):
+    entera = ejecutar(snapshot_dir, str(tmp_path / "entera"), modo, monkeypatch, 1000, 10**6, 1)
+    resumen = filas_resumen(capsys)
+    assert len(resumen) == 20
+    assert ejecutar(snapshot_dir, str(tmp_path / "tramos"), modo, monkeypatch, 3, 60 * 40, 1) == entera
+    assert filas_resumen(capsys) == resumen
+    assert ejecutar(snapshot_dir, str(tmp_path / "workers"), modo, monkeypatch, 2, 60 * 50, 2) == entera
+
+
+def test_el_resultado_de_una_tarea_no_crece_con_la_rejilla(snapshot_dir, monkeypatch):
+    from Backend.snapshot import cargar_snapshot, snapshot_publicado
+
+    monkeypatch.setattr(simulacion, "_ESTADO", {})
+    ruta = snapshot_publicado(snapshot_dir)
+    subs = cargar_snapshot(ruta).motor.sub_variables
+    escenarios = [("base", {})] + simulacion.rejilla_perturbaciones(subs, [0.1, 0.2, 0.3, 0.4])
+    simulacion._iniciar_worker(ruta, "pesos", escenarios, 3)
+    _, _, perfiles = simulacion.perfiles_aleatorios(20, VARIABLES, "pesos")
+
+    inicio, primero, resultados = simulacion.simular_bloque(0, perfiles, 4, 8)
+    assert (inicio, primero, len(resultados)) == (0, 4, 4)
+    assert all("spearman" in r for r in resultados)
+    _, _, resultados = simulacion.simular_bloque(0, perfiles, 0, 2)
+    assert "spearman" not in resultados[0] and "spearman" in resultados[1]
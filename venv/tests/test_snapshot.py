@@ -0,0 +1,127 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from Backend import snapshot
+from Backend.geometrias import respuesta_geometrias
+from Backend.pesos import DEFAULT_WEIGHTS
+from Backend.motor_scores import MotorScores
+from Backend.snapshot import (GestorDataset, cargar_snapshot, compilar_snapshot, leer_manifest, limpiar_snapshots,
+                              publicar_snapshot, snapshot_publicado)
+from benchmarks.sintetico import MongoMemoria, documentos_sinteticos
+
+VARIABLES = ["salut", "transporte", "precio", "ocio", "seguridad", "densidad_poblacion"]
+
+
+def compilar_y_publicar(directorio, n, version_mongo=None):
+    ruta = compilar_snapshot(documentos_sinteticos(n), VARIABLES, DEFAULT_WEIGHTS, directorio, version_mongo)
+    publicar_snapshot(ruta, directorio)
+    return ruta
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    mongo = MongoMemoria()
+    monkeypatch.setattr(snapshot, "MongoClient", lambda *a, **k: mongo)
+    return mongo
+
+
+def cargar_mongo(mongo, n):
+    """Como el seed: sustituye la colección y sube la versión en meta."""
+    col = mongo["db"]["barrios"]
+    col.delete_many({})
+    col.insert_many(documentos_sinteticos(n))
+    mongo["db"]["meta"].update_one({"_id": "barrios"}, {"$inc": {"version": 1}}, upsert=True)
+
+
+def gestor(directorio, variables=VARIABLES):
+    return GestorDataset(variables, DEFAULT_WEIGHTS, "mongodb://memoria", "db", "barrios", directorio)
+
+
+def test_ida_y_vuelta_compilar_publicar_cargar(tmp_path):
+    directorio = str(tmp_path)
+    docs = documentos_sinteticos(30)
+    ruta = compilar_y_publicar(directorio, 30, version_mongo=7)
+    assert snapshot_publicado(directorio) == ruta
+    # Mismo contenido -> misma versión: no se recompila
+    assert compilar_snapshot(docs, VARIABLES, DEFAULT_WEIGHTS, directorio, 7) == ruta
+
+    ds = cargar_snapshot(ruta)
+    esperado = MotorScores.desde_documentos(docs, VARIABLES, DEFAULT_WEIGHTS)
+    assert ds.manifest["version_mongo"] == 7 and ds.manifest["n_barrios"] == 30
+    assert ds.motor.ids == esperado.ids and ds.motor.nombres == esperado.nombres
+    np.testing.assert_array_equal(ds.motor.coords, esperado.coords)
+    np.testing.assert_array_equal(ds.motor.sub_tensor, esperado.sub_tensor)
+    for valor in snapshot.VALORES_RELLENO:
+        np.testing.assert_array_equal(ds.motor.matriz(valor), esperado.matriz(valor))
+    assert list(ds.motor.geometrias) == list(esperado.geometrias)
+    prefs = [{"salut": 0.8, "precio": 0.1}, {"ocio": 1.0}]
+    np.testing.assert_array_equal(ds.motor.puntuar_pesos_lote(prefs), esperado.puntuar_pesos_lote(prefs))
+
+
+def test_un_worker_recoge_el_snapshot_publicado_por_otro(tmp_path, mongo, capsys):
+    directorio = str(tmp_path)
+    cargar_mongo(mongo, 20)
+    a, b = gestor(directorio), gestor(directorio)
+    assert a.actual.ruta == b.actual.ruta
+
+    cargar_mongo(mongo, 25)
+    a.recargar_desde_mongo()
+    assert len(b.actual.motor) == 20
+    b.comprobar_cambios()
+    assert b.actual.ruta == a.actual.ruta and len(b.actual.motor) == 25
+    assert "publicado por otro proceso" in capsys.readouterr().out
+
+
+def test_subir_la_version_de_mongo_recompila(tmp_path, mongo):
+    directorio = str(tmp_path)
+    cargar_mongo(mongo, 20)
+    g = gestor(directorio)
+    ruta = g.actual.ruta
+
+    g.comprobar_cambios()  # nada nuevo
+    assert g.actual.ruta == ruta
+
+    cargar_mongo(mongo, 22)
+    g.comprobar_cambios()
+    assert g.actual.ruta != ruta and g.actual.manifest["version_mongo"] == 2
+    assert snapshot_publicado(directorio) == g.actual.ruta
+
+
+def test_manifest_incompatible_no_se_carga(tmp_path, mongo):
+    directorio = str(tmp_path)
+    cargar_mongo(mongo, 20)
+    # Publicado con otras variables (p. ej. por una versión anterior de la API)
+    ajeno = compilar_snapshot(documentos_sinteticos(20), VARIABLES[:-1], DEFAULT_WEIGHTS, directorio)
+    publicar_snapshot(ajeno, directorio)
+    g = gestor(directorio)
+    assert g.actual.ruta != ajeno and g.actual.motor.variables == VARIABLES
+
+    # Un formato antiguo publicado por otro proceso tampoco se activa
+    viejo = compilar_snapshot(documentos_sinteticos(21), VARIABLES, DEFAULT_WEIGHTS, directorio,
+                              g.actual.manifest["version_mongo"])
+    manifest = leer_manifest(viejo)
+    manifest["formato"] = snapshot.FORMATO_SNAPSHOT - 1
+    with open(os.path.join(viejo, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    publicar_snapshot(viejo, directorio)
+    actual = g.actual.ruta
+    g.comprobar_cambios()
+    assert g.actual.ruta == actual
+
+
+def test_un_worker_rezagado_sigue_sirviendo_geometrias_de_un_snapshot_borrado(tmp_path):
+    directorio = str(tmp_path)
+    rezagado = cargar_snapshot(compilar_y_publicar(directorio, 20))
+    # Otro worker recarga tres veces antes de que este vuelva a mirar ACTUAL
+    for n in (21, 22, 23):
+        compilar_y_publicar(directorio, n)
+        limpiar_snapshots(directorio)
+    assert not os.path.exists(rezagado.ruta)
+
+    for codificacion in ("gzip", "identity"):
+        r = respuesta_geometrias(rezagado.geometrias, 0, None, codificacion)
+        assert r.status_code == 200 and len(r.body) > 0
+    assert rezagado.motor.geometrias[0] is not None